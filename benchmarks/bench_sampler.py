@@ -0,0 +1,72 @@
+'''
+Benchmark of the Die sampling paths over a range of face counts.
+
+Compares, for one heavily weighted Die:
+    choice : the original path, np.random.choice with weights normalized on every call
+    cdf    : binary search of the cached cumulative weights (_sample_cdf)
+    alias  : Walker/Vose alias table (_sample_alias)
+
+Run from the repository root:
+    python benchmarks/bench_sampler.py [--rolls N] [--repeat R]
+'''
+
+import argparse
+import os
+import sys
+import timeit
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from montecarlo.montecarlo import _build_alias, _sample_alias, _sample_cdf
+
+
+FACE_COUNTS = [2, 6, 26, 100, 1000, 10000, 100000]
+
+
+def bench(n_faces, rolls, repeat):
+    '''
+    Purpose:
+    Time each sampling path for a Die with n_faces faces and Zipf-like (heavily skewed) weights.
+
+    Inputs:
+    n_faces : int number of faces.
+    rolls   : int number of rolls per timed call.
+    repeat  : int number of timed calls; the best one is reported.
+
+    Outputs:
+    times : dict of path name : best seconds per call.
+    '''
+
+    rng = np.random.default_rng(0)
+    faces = np.arange(n_faces)
+    weights = 1.0 / np.arange(1, n_faces + 1)
+
+    cdf = np.cumsum(weights) / weights.sum()
+    prob, alias = _build_alias(weights)
+
+    paths = {
+        "choice" : lambda: np.random.choice(faces, size = rolls, replace = True, p = weights / weights.sum()),
+        "cdf"    : lambda: _sample_cdf(cdf, rng.random(rolls), np.uint32),
+        "alias"  : lambda: _sample_alias(prob, alias, rng, rolls, np.uint32),
+    }
+
+    return {name: min(timeit.repeat(f, number = 1, repeat = repeat)) for name, f in paths.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description = __doc__, formatter_class = argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rolls", type = int, default = 10**6, help = "rolls per timed call")
+    parser.add_argument("--repeat", type = int, default = 5, help = "timed calls per path (best is reported)")
+    args = parser.parse_args()
+
+    print(f"{'faces':>8} {'choice (s)':>12} {'cdf (s)':>12} {'alias (s)':>12} {'alias Mrolls/s':>15}")
+
+    for n_faces in FACE_COUNTS:
+        t = bench(n_faces, args.rolls, args.repeat)
+        print(f"{n_faces:>8} {t['choice']:>12.4f} {t['cdf']:>12.4f} {t['alias']:>12.4f} {args.rolls / t['alias'] / 1e6:>15.1f}")
+
+
+if __name__ == "__main__":
+    main()
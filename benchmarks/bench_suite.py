@@ -0,0 +1,234 @@
+'''
+Benchmark suite for the hot paths of Die, Game and Analyzer.
+
+Each benchmark is run over a matrix of face counts, numbers of dice and numbers of rolls, with Zipf-like (heavily skewed)
+weights so the weighted samplers are exercised. For every case it reports:
+    seconds      : best time of --repeat calls (setup, such as playing the game an Analyzer reads, is not timed)
+    rolls/s      : rolls sampled or analyzed per second
+    peak memory  : peak bytes allocated during one extra call, traced with tracemalloc
+
+Results are saved as JSON along with the commit and library versions, and can be compared against an earlier run to spot
+regressions.
+
+Run from the repository root:
+    python benchmarks/bench_suite.py [--output FILE] [--compare BASELINE] [--quick]
+                                     [--faces 2 6 26 1000] [--dice 2 5 10] [--rolls 10000 100000]
+                                     [--repeat R] [--only NAME ...]
+'''
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir)
+sys.path.insert(0, ROOT)
+
+from montecarlo.montecarlo import Analyzer, Die, Game
+
+
+FACE_COUNTS = [2, 6, 26, 1000]
+DICE_COUNTS = [2, 5, 10]
+ROLL_COUNTS = [10**4, 10**5]
+
+
+def make_die(n_faces):
+    '''
+    Purpose:
+    Build a Die with n_faces faces and Zipf-like weights.
+
+    Inputs:
+    n_faces : int number of faces.
+
+    Outputs:
+    die : Die object.
+    '''
+
+    die = Die(np.arange(n_faces), seed = 0)
+    die.change_weights(1.0 / np.arange(1, n_faces + 1))
+
+    return die
+
+
+def played_game(n_faces, n_dice, rolls):
+    '''
+    Purpose:
+    Build a Game of n_dice Zipf-weighted dice and play it, for the benchmarks that time reading a play.
+
+    Inputs:
+    n_faces : int number of faces.
+    n_dice  : int number of dice.
+    rolls   : int number of rolls.
+
+    Outputs:
+    game : Game object with a last play of rolls rolls.
+    '''
+
+    game = Game([make_die(n_faces) for _ in range(n_dice)], seed = 0)
+    game.play_codes(rolls)
+
+    return game
+
+
+# name : (setup, run, uses the number of dice). setup(n_faces, n_dice, rolls) builds what run() needs, fresh for every call
+# so no cached result is timed; run(state, rolls) is the timed call.
+BENCHMARKS = {
+    "Die.roll"                   : (lambda f, d, r : make_die(f),
+                                    lambda die, r : die.roll(r), False),
+    "Game.play"                  : (lambda f, d, r : Game([make_die(f) for _ in range(d)], seed = 0),
+                                    lambda game, r : game.play(r), True),
+    "Game.get_last_play(narrow)" : (played_game,
+                                    lambda game, r : game.get_last_play("narrow"), True),
+    "Analyzer.jackpot"           : (lambda f, d, r : Analyzer(played_game(f, d, r)),
+                                    lambda analyzer, r : analyzer.jackpot(), True),
+    "Analyzer.face_counts"       : (lambda f, d, r : Analyzer(played_game(f, d, r)),
+                                    lambda analyzer, r : analyzer.face_counts(), True),
+    "Analyzer.combo_counts"      : (lambda f, d, r : Analyzer(played_game(f, d, r)),
+                                    lambda analyzer, r : analyzer.combo_counts(), True),
+    "Analyzer.perm_counts"       : (lambda f, d, r : Analyzer(played_game(f, d, r)),
+                                    lambda analyzer, r : analyzer.perm_counts(), True),
+}
+
+
+def measure(setup, run, n_faces, n_dice, rolls, repeat):
+    '''
+    Purpose:
+    Time one benchmark case and trace its peak memory.
+
+    Inputs:
+    setup   : callable building the state for one call.
+    run     : callable making the timed call.
+    n_faces : int number of faces.
+    n_dice  : int number of dice.
+    rolls   : int number of rolls.
+    repeat  : int number of timed calls; the best one is reported.
+
+    Outputs:
+    (seconds, peak) : float best seconds per call, and int peak bytes allocated by one call.
+    '''
+
+    best = float("inf")
+
+    for _ in range(repeat):
+        state = setup(n_faces, n_dice, rolls)
+        start = time.perf_counter()
+        run(state, rolls)
+        best = min(best, time.perf_counter() - start)
+
+    # Memory is traced in a separate call, since tracing slows the allocations down
+    state = setup(n_faces, n_dice, rolls)
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    run(state, rolls)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return best, peak
+
+
+def environment():
+    '''
+    Purpose:
+    Describe what the benchmarks ran on, so runs from different commits or machines can be told apart.
+
+    Inputs:
+    None.
+
+    Outputs:
+    info : dict of commit, versions, platform and time.
+    '''
+
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd = ROOT, capture_output = True, text = True,
+                                check = True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    return {"commit" : commit, "python" : platform.python_version(), "numpy" : np.__version__,
+            "pandas" : pd.__version__, "platform" : platform.platform(), "processor" : platform.processor(),
+            "time" : datetime.datetime.now(datetime.timezone.utc).isoformat(timespec = "seconds")}
+
+
+def compare(results, baseline_path):
+    '''
+    Purpose:
+    Print how each case changed against a baseline JSON file written by an earlier run.
+
+    Inputs:
+    results       : list of result dicts from this run.
+    baseline_path : str path of the baseline file.
+
+    Outputs:
+    None.
+    '''
+
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+
+    key = lambda r : (r["benchmark"], r["faces"], r["dice"], r["rolls"])
+    before = {key(r) : r for r in baseline["results"]}
+
+    print(f"\nCompared with {baseline_path} (commit {baseline['environment'].get('commit')}):")
+    print(f"{'benchmark':<28} {'faces':>6} {'dice':>5} {'rolls':>9} {'time ratio':>11} {'memory ratio':>13}")
+
+    for r in results:
+        old = before.get(key(r))
+        if old is None: continue
+
+        time_ratio = r["seconds"] / old["seconds"] if old["seconds"] else float("nan")
+        memory_ratio = r["peak_bytes"] / old["peak_bytes"] if old["peak_bytes"] else float("nan")
+        print(f"{r['benchmark']:<28} {r['faces']:>6} {r['dice']:>5} {r['rolls']:>9} {time_ratio:>11.2f} {memory_ratio:>13.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description = __doc__, formatter_class = argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--faces", type = int, nargs = "+", default = FACE_COUNTS, help = "face counts")
+    parser.add_argument("--dice", type = int, nargs = "+", default = DICE_COUNTS, help = "numbers of dice")
+    parser.add_argument("--rolls", type = int, nargs = "+", default = ROLL_COUNTS, help = "numbers of rolls")
+    parser.add_argument("--repeat", type = int, default = 3, help = "timed calls per case (best is reported)")
+    parser.add_argument("--only", nargs = "+", choices = list(BENCHMARKS), help = "run only these benchmarks")
+    parser.add_argument("--quick", action = "store_true", help = "small matrix for a smoke run")
+    parser.add_argument("--output", default = "bench_results.json", help = "JSON file to write the results to")
+    parser.add_argument("--compare", help = "JSON file of an earlier run to compare against")
+    args = parser.parse_args()
+
+    if args.quick:
+        args.dice, args.rolls, args.repeat = [2, 5], [10**4], 1
+
+    names = args.only or list(BENCHMARKS)
+    results = []
+
+    print(f"{'benchmark':<28} {'faces':>6} {'dice':>5} {'rolls':>9} {'seconds':>10} {'Mrolls/s':>10} {'peak MiB':>10}")
+
+    for name in names:
+        setup, run, uses_dice = BENCHMARKS[name]
+
+        for n_faces in args.faces:
+            # Die.roll doesn't depend on the number of dice, so it is run once per face and roll count
+            for n_dice in (args.dice if uses_dice else [1]):
+                for rolls in args.rolls:
+                    seconds, peak = measure(setup, run, n_faces, n_dice, rolls, args.repeat)
+                    results.append({"benchmark" : name, "faces" : n_faces, "dice" : n_dice, "rolls" : rolls,
+                                    "seconds" : seconds, "rolls_per_second" : rolls / seconds, "peak_bytes" : peak})
+
+                    print(f"{name:<28} {n_faces:>6} {n_dice:>5} {rolls:>9} {seconds:>10.4f} "
+                          f"{rolls / seconds / 1e6:>10.2f} {peak / 2**20:>10.1f}")
+
+    with open(args.output, "w") as f:
+        json.dump({"environment" : environment(), "repeat" : args.repeat, "results" : results}, f, indent = 1)
+
+    print(f"\nSaved {len(results)} results to {args.output}")
+
+    if args.compare: compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
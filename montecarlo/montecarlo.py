@@ -3,444 +3,3136 @@
 
 
 
+import asyncio
+import bisect
+import hashlib
+import inspect
+import json
+import math
+import os
+import statistics
+import weakref
+from concurrent.futures import ProcessPoolExecutor
+
 import numpy as np
 import pandas as pd
 
+# pyarrow is optional: without it, plays and results are saved as .npz files instead of Parquet
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+
+
+######################################################################################################################
+###### Sampling helpers ##############################################################################################
+######################################################################################################################
+
+def _code_dtype(n_faces):
+    '''
+    Purpose:
+    Pick the smallest unsigned integer dtype that can hold a code (position in the faces array) for every face.
+
+    Inputs:
+    n_faces : int number of faces on the dice.
+
+    Outputs:
+    dtype : numpy unsigned integer dtype.
+    '''
+
+    for dtype in (np.uint8, np.uint16, np.uint32):
+        if n_faces <= np.iinfo(dtype).max + 1: return np.dtype(dtype)
+
+    return np.dtype(np.uint64)
+
+
+def _make_rng(seed=None):
+    '''
+    Purpose:
+    Build the random number generator used for sampling from whatever the user passed as a seed.
+
+    Inputs:
+    seed : None, int, numpy SeedSequence or numpy Generator. A Generator is used as is; anything else seeds a new one
+           (None seeds it from fresh OS entropy).
+
+    Outputs:
+    rng : numpy Generator.
+    '''
+
+    try:
+        return np.random.default_rng(seed)
+    except (TypeError, ValueError):
+        raise TypeError("Seed must be None, an integer, a numpy SeedSequence or a numpy Generator.")
+
+
+def _spawn_seeds(seed, n):
+    '''
+    Purpose:
+    Split one seed into n independent child streams (one per worker or chunk) with SeedSequence.spawn, so parallel
+    results are reproducible from a single seed.
+
+    Inputs:
+    seed : None, int, numpy SeedSequence or numpy Generator.
+    n    : int number of child streams.
+
+    Outputs:
+    seeds : list of n numpy SeedSequence objects.
+    '''
+
+    if isinstance(seed, np.random.Generator):
+        # Draw the root entropy from the Generator so the children follow its state
+        seed = np.random.SeedSequence(int(seed.integers(2**63)))
+
+    elif not isinstance(seed, np.random.SeedSequence):
+        seed = np.random.SeedSequence(seed)
+
+    return seed.spawn(n)
+
+
+def _check_weights(weights):
+    '''
+    Purpose:
+    Make sure weights can be sampled from before a sampling table is built from them.
+
+    Inputs:
+    weights : numpy float array of weights, one per face (or a 2-D array with one row per die).
+
+    Outputs:
+    None.
+    '''
+
+    # raise ValueError if a weight is negative or not finite, or a die's weights are all zero
+    if not np.isfinite(weights).all() or (weights < 0).any() or not (weights.sum(axis = -1) > 0).all():
+        raise ValueError("Weights must be finite and non-negative, with at least one positive weight per die.")
+
+
+def _sample_cdf(cdf, u, dtype):
+    '''
+    Purpose:
+    Turn uniform draws into face codes by inverting a cumulative-weight table.
+
+    Inputs:
+    cdf   : numpy float array of cumulative normalized weights (last value is 1.0).
+    u     : numpy float array of uniform draws in [0, 1).
+    dtype : numpy integer dtype of the returned codes.
+
+    Outputs:
+    codes : numpy array (same shape as u) of integer codes into the faces array.
+    '''
+
+    codes = np.searchsorted(cdf, u, side = "right")
+
+    # Rounding can leave cdf[-1] a hair under 1.0, so keep codes inside the table
+    np.minimum(codes, len(cdf) - 1, out = codes)
+
+    return codes.astype(dtype, copy = False)
+
+
+def _build_alias(weights):
+    '''
+    Purpose:
+    Build a Walker/Vose alias table so a face can be sampled in O(1) no matter how many faces there are.
+
+    Inputs:
+    weights : numpy float array of nonnegative weights, one per face (need not be normalized).
+
+    Outputs:
+    prob  : numpy float array; a roll that lands in column k keeps face k with probability prob[k].
+    alias : numpy integer array; the face a roll in column k switches to otherwise.
+    '''
+
+    n = len(weights)
+    scaled = (weights * (n / weights.sum())).tolist()
+    prob = [1.0] * n
+    alias = list(range(n))
+
+    small = [k for k in range(n) if scaled[k] < 1.0]
+    large = [k for k in range(n) if scaled[k] >= 1.0]
+
+    # Fill each underfull column with the leftover mass of an overfull one
+    while small and large:
+        s, l = small.pop(), large[-1]
+        prob[s] = scaled[s]
+        alias[s] = l
+
+        scaled[l] -= 1.0 - scaled[s]
+        if scaled[l] < 1.0:
+            small.append(large.pop())
+
+    # Whatever is left is full up to rounding error; prob stays at 1.0 for those columns
+    return np.array(prob), np.array(alias, dtype = _code_dtype(n))
+
+
+def _sample_alias(prob, alias, rng, size, dtype):
+    '''
+    Purpose:
+    Sample face codes from an alias table: pick a column uniformly, then keep it or switch to its alias.
+
+    Inputs:
+    prob  : numpy float array from _build_alias().
+    alias : numpy integer array from _build_alias().
+    rng   : numpy Generator.
+    size  : int number of codes to draw.
+    dtype : numpy integer dtype of the returned codes.
+
+    Outputs:
+    codes : numpy array of length size of integer codes into the faces array.
+    '''
+
+    columns = rng.integers(0, len(prob), size = size, dtype = dtype)
+    keep = rng.random(size) < prob[columns]
+
+    return np.where(keep, columns, alias[columns].astype(dtype, copy = False))
+
+
+# Dice with more faces than this are sampled through their alias table instead of a binary search of the cumulative
+# weights (see benchmarks/bench_sampler.py for where the two cross over)
+_ALIAS_MIN_FACES = 4
+
+# Rolls per chunk when a play is split across processes. Chunks, not workers, get their own random streams, so a seeded
+# parallel play gives the same result for any number of workers.
+_CHUNK_SIZE = 2**20
+
+# Play files (Game.play_to_file()) start with this tag, an 8 byte header length and a JSON header; the codes follow at the
+# next multiple of _PLAY_FILE_ALIGN bytes so they can be memory-mapped directly
+_PLAY_FILE_MAGIC = b"MCPLAY1\n"
+_PLAY_FILE_ALIGN = 64
+
+
+def _play_chunk(dice_set, times, dtype, seed):
+    '''
+    Purpose:
+    Worker for parallel plays: roll one chunk of a game from its own child seed.
+
+    Inputs:
+    dice_set : DiceSet object of the game's dice.
+    times    : int number of rolls in the chunk.
+    dtype    : numpy integer dtype of the codes.
+    seed     : numpy SeedSequence for this chunk.
+
+    Outputs:
+    codes : numpy array of shape (times, number of dice) of face codes.
+    '''
+
+    codes = np.empty((times, len(dice_set)), dtype = dtype)
+    dice_set.sample(np.random.default_rng(seed), codes)
+
+    return codes
+
+
+
+
+######################################################################################################################
+###### Die ###########################################################################################################
+######################################################################################################################
+
+def _faces_digest(faces):
+    '''
+    Purpose:
+    Digest the values of a faces array, in order, the same way in every process (unlike hash(), which is salted for
+    strings). Equal faces give equal digests whatever their dtype (e.g. int32 and float64, or strings of any width), so
+    differing digests prove the faces differ; equal digests still have to be confirmed face by face.
+
+    Inputs:
+    faces : numpy array of faces.
+
+    Outputs:
+    digest : str hex digest, or None for faces that can't be digested this way (e.g. object arrays).
+    '''
+
+    if faces.dtype.kind in "biuf":
+        # Numbers are compared by value; adding 0.0 turns -0.0 into 0.0
+        data = (faces.astype(np.float64) + 0.0).tobytes()
+    elif faces.dtype.kind in "US":
+        data = "\x00".join(map(repr, faces.tolist())).encode()
+    else:
+        return None
+
+    return hashlib.sha1(data).hexdigest()
+
+
+class Die:
+    '''
+    A Die object represents a stochastic object with a specified number of faces represented by unique symbols (str or numeric,
+    e.g. "H" and "T" for a coin or 1, 2, 3, 4, 5, and 6 for an actual die), each with a weight representing its probability
+    of being rolled.
+
+    The object simulates a die (or coin, etc.) by randomly selecting from the faces a specified number of times and returning
+    a list of results (e.g. ["H", "H", "T", "H", "T"] for a coin flipped 5x).
+
+    The weights of the faces can be changed to create "unfair" dice.
+    '''
+
+
+    def __init__(self, faces, seed=None):
+        '''
+        Purpose:
+        Initializes Die object with a specified number of sides (which can represent a coin (2 sides),
+        an actual die (6 sides), etc.).
+
+        Inputs:
+        faces : numpy array with distinct values representing each face (e.g. array(["Heads", "Tails"])
+                for a coin.)
+        seed  : None, int, numpy SeedSequence or numpy Generator used for roll(). Defaults to None (unseeded).
+
+        Outputs:
+        Die object with given number of sides and equal weights of 1.0 (a fair coin, die, etc.).
+        '''
+
+        # raise TypeError if argument is not a numpy array
+        if not isinstance(faces, np.ndarray):
+            raise TypeError("Die must be initialized with a NumPy array.")
+        
+        # face : code lookup, so change_weight doesn't search the faces
+        index = dict(zip(faces.tolist(), range(len(faces))))
+
+        # raise ValueEroor if faces are not unique (the lookup keeps one entry per distinct face, without sorting them)
+        if not len(faces) == len(index):
+            raise ValueError("Duplicate faces.")
+
+
+        # instantiate object faces array and equal weights
+        else:
+            self._faces = faces
+            self._weights = np.ones(len(faces))
+            self._index = index
+
+            # Dice with equal faces (in the same order) have equal signatures, so most dissimilar dice are rejected in O(1)
+            self._signature = (len(faces), _faces_digest(faces))
+
+            self._rng = _make_rng(seed)
+
+            # derived from the weights when first needed, and dropped whenever they change; a Game holding the Die
+            # compares _version to know when to rebuild its DiceSet
+            self._version = 0
+            self._state = None
+            self._cdf_table = None
+            self._alias = None
+
+    @classmethod
+    def from_counts(cls, counts, seed=None):
+        '''
+        Purpose:
+        Build a Die weighted by face counts in one pass, instead of calling change_weight() once per face. Counts can come
+        from a file of "face count" lines (like english_letters.txt, "E 529117365"), parsed in bulk, so even dice with
+        millions of faces (e.g. one face per word) are quick to build.
+
+        Inputs:
+        counts : str path of a file with one face and its count per line, separated by whitespace (faces are read as
+                 strings), or a dict / pandas Series of face : count.
+        seed   : None, int, numpy SeedSequence or numpy Generator used for roll(). Defaults to None (unseeded).
+
+        Outputs:
+        die : Die object with the given faces, each weighted by its count.
+        '''
+
+        if isinstance(counts, (str, os.PathLike)):
+            # keep_default_na so faces like "NA" or "NULL" stay faces
+            table = pd.read_csv(counts, sep = r"\s+", header = None, names = ["Face", "Count"], dtype = {"Face" : str},
+                                keep_default_na = False)
+            faces, weights = table["Face"].to_numpy().astype(str), table["Count"].to_numpy()
+
+        elif isinstance(counts, pd.Series):
+            faces, weights = counts.index.to_numpy(), counts.to_numpy()
+
+        elif isinstance(counts, dict):
+            faces, weights = np.array(list(counts.keys())), list(counts.values())
+
+        # raise TypeError for anything else
+        else:
+            raise TypeError("Counts must be a file path, a dict or a pandas Series.")
+
+        # raise TypeError if counts cannot be interpreted as numeric
+        try:
+            weights = np.array(weights, dtype = np.float64)
+        except (TypeError, ValueError):
+            raise TypeError("Counts must be numeric.")
+
+        die = cls(faces, seed)
+        die._weights = weights
+
+        return die
+
+
+    def _same_faces(self, other):
+        '''
+        Purpose:
+        Check that another Die has the same faces, in the same order. Their cached signatures reject most other dice at once;
+        when the signatures agree, the faces are compared one by one to be sure.
+
+        Inputs:
+        other : Die object.
+
+        Outputs:
+        same : bool.
+        '''
+
+        (n, digest), (other_n, other_digest) = self._signature, other._signature
+
+        if n != other_n: return False
+        if digest is not None and other_digest is not None and digest != other_digest: return False
+
+        return self._faces is other._faces or bool(np.array_equal(self._faces, other._faces))
+
+
+    def change_weight(self, face, new_weight):
+        '''
+        Purpose:
+        Allows the user to change the weight of a given face to make the die "unfair".
+
+        Inputs:
+        face       : str or numeric representation of one of the faces
+        new_weight : new weight for that side (e.g. new_weight = 5 would make that face 5x more likely to be rolled
+                     if no other faces were changed)
+
+        Outputs:
+        None (in-place change of Die object's state attribute).
+        '''
+
+        # raise IndexError if the face given is not part of the Die
+        if face not in self._index:
+            raise IndexError("No such face.")
+        
+        # raise TypeError if weight cannot be interpreted as numeric
+        try:
+            new_weight = float(new_weight)
+        except:
+            raise TypeError("New weight must be numeric")
+        
+        # change weight
+        self._weights[self._index[face]] = new_weight
+        self._weights_changed()
+
+
+    def change_weights(self, new_weights):
+        '''
+        Purpose:
+        Change the weights of many faces at once. Every new weight is checked before any is applied, and the sampler is
+        rebuilt once, on the next roll, rather than after each face.
+
+        Inputs:
+        new_weights : dict or pandas Series of face : new weight, or an array-like with a new weight for every face, in the
+                      order of the faces.
+
+        Outputs:
+        None (in-place change of Die object's state attribute).
+        '''
+
+        if isinstance(new_weights, (dict, pd.Series)):
+            faces = list(new_weights.keys())
+            codes = np.fromiter((self._index.get(face, -1) for face in faces), dtype = np.intp, count = len(faces))
+
+            # raise IndexError if any face given is not part of the Die
+            if (codes < 0).any():
+                raise IndexError("No such face.")
+
+            values = list(new_weights.values()) if isinstance(new_weights, dict) else new_weights.to_numpy()
+
+        else:
+            codes = slice(None)
+            values = new_weights
+
+        # raise TypeError if weights cannot be interpreted as numeric
+        try:
+            values = np.array(values, dtype = np.float64)
+        except (TypeError, ValueError):
+            raise TypeError("New weights must be numeric")
+
+        # raise ValueError if an array doesn't have one weight per face
+        if isinstance(codes, slice) and values.shape != self._weights.shape:
+            raise ValueError("New weights must have one weight per face.")
+
+        self._weights[codes] = values
+        self._weights_changed()
+
+
+    def _weights_changed(self):
+        '''
+        Purpose:
+        Drop everything derived from the weights after they change; it is rebuilt when next needed.
+
+        Inputs:
+        None.
+
+        Outputs:
+        None.
+        '''
+
+        self._version += 1
+        self._state = None
+        self._cdf_table = None
+        self._alias = None
+
+
+    def roll(self, times=1, seed=None):
+        '''
+        Purpose:
+        Simulates rolling the die a given number of times, returning a list of outcomes of the rolls without storing
+        the results.
+
+        Inputs:
+        times : int number of rolls to be recorded
+        seed  : None, int, numpy SeedSequence or numpy Generator. If given, the rolls are drawn from it instead of the
+                Die's own generator, so the same seed always gives the same outcomes. Defaults to None.
+
+        Outputs:
+        outcomes : list of length(times) of the results of the rolls
+        '''
+
+        # raise TypeError if times is not an integer
+        try:
+            int(times)
+        except:
+            raise TypeError("Argument must be an integer.")
+        
+        # return a list with times number of values randomlly chosen from the die, with applied weights, without saving in memory
+        rng = self._rng if seed is None else _make_rng(seed)
+        codes = self._sample(rng, int(times), np.intp)
+        return list(self._faces[codes])
+
+
+    def _sample(self, rng, times, dtype):
+        '''
+        Purpose:
+        Draw face codes (positions in the faces array) with the faster sampler for this Die: its alias table when the Die
+        has many faces, a binary search of its cumulative weights otherwise.
+
+        Inputs:
+        rng   : numpy Generator.
+        times : int number of codes to draw.
+        dtype : numpy integer dtype of the returned codes.
+
+        Outputs:
+        codes : numpy array of length times of integer codes.
+        '''
+
+        if len(self._faces) <= _ALIAS_MIN_FACES:
+            return _sample_cdf(self._cdf(), rng.random(times), dtype)
+
+        prob, alias = self._alias_table()
+        return _sample_alias(prob, alias, rng, times, dtype)
+
+
+    def _alias_table(self):
+        '''
+        Purpose:
+        Retrieve the Die's alias table, building it only if the weights changed since it was last built.
+
+        Inputs:
+        None.
+
+        Outputs:
+        (prob, alias) : numpy arrays from _build_alias().
+        '''
+
+        if self._alias is None:
+            _check_weights(self._weights)
+            self._alias = _build_alias(self._weights)
+
+        return self._alias
+
+
+    def _cdf(self):
+        '''
+        Purpose:
+        Retrieve the cumulative-weight table used to sample faces by their codes (positions in the faces array), building
+        it only if the weights changed since it was last built.
+
+        Inputs:
+        None.
+
+        Outputs:
+        cdf : numpy float array of cumulative normalized weights, one per face.
+        '''
+
+        if self._cdf_table is None:
+            _check_weights(self._weights)
+            cdf = np.cumsum(self._weights)
+            self._cdf_table = cdf / cdf[-1]
+
+        return self._cdf_table
+
+
+    def get_state(self):
+        '''
+        Purpose:
+        Safely access the state object of the Die, which holds the names and weights of each face in a pandas data frame.
+
+        Inputs:
+        None.
+
+        Outputs:
+        state: pandas data frame with names and weights of each face of the Die object.
+        '''
+
+        # The data frame is only a view for the user; build it when asked for after the weights change
+        if self._state is None:
+            self._state = pd.DataFrame({"Weight" : self._weights.copy()}, index = pd.Index(self._faces, name = "Face"))
+
+        return self._state
+        
+
+
+
+
+
+######################################################################################################################
+###### DiceSet #######################################################################################################
+######################################################################################################################
+
+class DiceSet():
+    '''
+    DiceSet object holds several dice with the same faces as one faces array and one weight matrix (a row of weights per
+    die), so a whole roll of every die can be drawn in one vectorized pass.
+
+    A Game builds one from its list of Die objects, or can be given one directly.
+    '''
+
+
+    def __init__(self, faces, weights):
+        '''
+        Purpose:
+        Initializes a DiceSet from the shared faces and the weights of each die.
+
+        Inputs:
+        faces   : numpy array with distinct values representing each face.
+        weights : 2-D array-like of shape (number of dice, number of faces) of non-negative numeric weights, one row per die.
+
+        Outputs:
+        DiceSet object with the given faces and weights.
+        '''
+
+        # raise TypeError if faces are not a numpy array
+        if not isinstance(faces, np.ndarray):
+            raise TypeError("DiceSet must be initialized with a NumPy array of faces.")
+
+        # raise ValueError if faces are not unique
+        if not len(faces) == len(np.unique(faces)):
+            raise ValueError("Duplicate faces.")
+
+        # raise TypeError if weights cannot be interpreted as numeric
+        try:
+            weights = np.array(weights, dtype = np.float64)
+        except (TypeError, ValueError):
+            raise TypeError("Weights must be numeric.")
+
+        # raise ValueError if there isn't one row of weights per die and one column per face
+        if weights.ndim != 2 or weights.shape[1] != len(faces):
+            raise ValueError("Weights must have shape (number of dice, number of faces).")
+
+        self._faces = faces
+        self._weights = weights
+
+        # sampling tables, built on the first roll
+        self._tables = None
+
+
+    @classmethod
+    def from_dice(cls, dice):
+        '''
+        Purpose:
+        Build a DiceSet from a list of similar Die objects (same number and names of faces).
+
+        Inputs:
+        dice : list of Die objects.
+
+        Outputs:
+        dice_set : DiceSet object with the faces of the dice and a copy of their weights.
+        '''
+
+        # raise TypeError if not given a list of Die objects
+        if not isinstance(dice, list) or not all(isinstance(die, Die) for die in dice):
+            raise TypeError("DiceSet must be built from a list of Die objects.")
+
+        # raise ValueError if the dice have different faces
+        if any(not die._same_faces(dice[0]) for die in dice):
+            raise ValueError("Dice must be similar (same number and names of faces).")
+
+        faces = dice[0]._faces if dice else np.array([])
+        return cls(faces, [die._weights for die in dice] if dice else np.empty((0, len(faces))))
+
+
+    def __len__(self):
+        '''
+        Purpose:
+        Number of dice in the set.
+        '''
+
+        return self._weights.shape[0]
+
+
+    def get_faces(self):
+        '''
+        Purpose:
+        Safely retrieve the faces shared by every die.
+
+        Inputs:
+        None.
+
+        Outputs:
+        faces : numpy array of faces.
+        '''
+
+        return self._faces
+
+
+    def get_weights(self):
+        '''
+        Purpose:
+        Safely retrieve the weights of every die.
+
+        Inputs:
+        None.
+
+        Outputs:
+        weights : numpy float array of shape (number of dice, number of faces), one row per die.
+        '''
+
+        return self._weights.copy()
+
+
+    def to_dice(self):
+        '''
+        Purpose:
+        Convert the set back to a list of separate Die objects.
+
+        Inputs:
+        None.
+
+        Outputs:
+        dice : list of Die objects with the set's faces, weighted like its rows.
+        '''
+
+        dice = []
+        for weights in self._weights:
+            die = Die(self._faces)
+            die._weights = weights.copy()
+            dice.append(die)
+
+        return dice
+
+
+    def _sampling_tables(self):
+        '''
+        Purpose:
+        Build (once) what sample() draws from: nothing when every die is fair, each die's cumulative weights when the dice
+        have few faces, or alias tables (one per distinct row of weights) otherwise.
+
+        Inputs:
+        None.
+
+        Outputs:
+        (kind, tables) : kind "fair", "cdf" or "alias", and the matching tables.
+        '''
+
+        if self._tables is not None:
+            return self._tables
+
+        weights = self._weights
+        _check_weights(weights)
+
+        if (weights == weights[:, :1]).all():
+            self._tables = ("fair", None)
+
+        elif weights.shape[1] <= _ALIAS_MIN_FACES:
+            # The last cumulative weight is always 1, so it is left out
+            cdf = np.cumsum(weights, axis = 1)
+            self._tables = ("cdf", cdf[:, :-1] / cdf[:, -1:])
+
+        else:
+            # Dice weighted the same way share one alias table; rows are matched by their bytes, which stays linear in the
+            # number of faces
+            tables = {}
+            for row in weights:
+                if row.tobytes() not in tables: tables[row.tobytes()] = _build_alias(row)
+
+            prob = np.array([tables[row.tobytes()][0] for row in weights])
+            alias = np.array([tables[row.tobytes()][1] for row in weights])
+            self._tables = ("alias", (prob, alias))
+
+        return self._tables
+
+
+    def sample(self, rng, out):
+        '''
+        Purpose:
+        Roll every die once per row of out, writing the face codes (positions in the faces array) in place. All the dice
+        are drawn together from one matrix of uniform draws, in blocks of about 2**20 codes.
+
+        Inputs:
+        rng : numpy Generator.
+        out : numpy integer array of shape (rolls, number of dice) to fill.
+
+        Outputs:
+        None (out is filled in place).
+        '''
+
+        kind, tables = self._sampling_tables()
+        n_dice, n_faces = self._weights.shape
+
+        if kind == "fair":
+            out[:] = rng.integers(0, n_faces, size = out.shape, dtype = out.dtype)
+            return
+
+        rows_per_block = max(1, _CHUNK_SIZE // max(n_dice, 1))
+        columns = np.arange(n_dice)
+
+        for start in range(0, out.shape[0], rows_per_block):
+            block = out[start:start + rows_per_block]
+
+            if kind == "cdf":
+                # A draw's code is the number of the die's cumulative weights it passes; with few faces, comparing
+                # against each column of the table beats a binary search
+                u = rng.random(block.shape)
+                block[:] = 0
+                for k in range(n_faces - 1):
+                    block += u >= tables[:, k]
+
+            else:
+                prob, alias = tables
+                codes = rng.integers(0, n_faces, size = block.shape)
+                keep = rng.random(block.shape) < prob[columns, codes]
+                block[:] = np.where(keep, codes, alias[columns, codes])
+
+
+    def _inverse_cdf(self, u, out):
+        '''
+        Purpose:
+        Turn a matrix of uniform draws into face codes by inverting each die's cumulative weights. Unlike sample(), the same
+        draws give comparable rolls for dice weighted differently (common random numbers), since shifting weight toward a
+        face only moves the draws near its edges.
+
+        Inputs:
+        u   : numpy float array of shape (rolls, number of dice) of uniform draws in [0, 1).
+        out : numpy integer array of the same shape to fill.
+
+        Outputs:
+        None (out is filled in place).
+        '''
+
+        n_dice, n_faces = self._weights.shape
+        _check_weights(self._weights)
+        cdf = np.cumsum(self._weights, axis = 1)
+        cdf = cdf[:, :-1] / cdf[:, -1:]
+
+        if n_faces <= _ALIAS_MIN_FACES:
+            out[:] = 0
+            for k in range(n_faces - 1):
+                out += u >= cdf[:, k]
+            return
+
+        # Row j's cumulative weights shifted into [j, j + 1] make one sorted table, searched for u + j all at once
+        columns = np.arange(n_dice)
+        table = (cdf + columns[:, None]).ravel()
+        codes = np.searchsorted(table, (u + columns).ravel(), side = "right").reshape(u.shape) - columns * (n_faces - 1)
+
+        # u + j can round up to j + 1, which lands just past the die's last face
+        out[:] = np.minimum(codes, n_faces - 1)
+
+
+
+
+
+
+######################################################################################################################
+###### Game ##########################################################################################################
+######################################################################################################################
+
+class Game():
+    '''
+    Game object takes one or more dice (of the Die class, or a DiceSet) with the same number and names of faces and simulates
+    rolling them.  
+    '''
+
+
+    def __init__(self, dice, seed=None, keep_history=False):
+        '''
+        Purpose:
+        Initializes a Game object with a given list of dice.
+
+        Inputs:
+        dice         : list of Die objects with the same number and labels of faces, or a DiceSet. A list is converted to a
+                       DiceSet for rolling, which is rebuilt whenever a Die's weights change.
+        seed         : None, int, numpy SeedSequence or numpy Generator used for play(). Defaults to None (unseeded).
+        keep_history : bool. If True, every play is also appended to a compact history of codes, retrievable with
+                       get_history(). Defaults to False (only the last play is kept).
+
+        Outputs:
+        Game object with the given dice.        
+        '''
+
+        # A DiceSet is used as is; its Die objects are only made if get_dice() asks for them
+        if isinstance(dice, DiceSet):
+            self._dice = None
+            self._dice_set = dice
+            self._dice_versions = None
+            n_dice = len(dice)
+
+        # raise TypeError if the object passed to the initializer is not a list or a DiceSet
+        elif not isinstance(dice, list):
+            raise TypeError("Game object must be instantiated with a list.")
+
+        else:
+            for die in dice:
+                # raise TypeError if any element of the list is not a Die object
+                if not isinstance(die, Die): raise TypeError("Game object must be instantiated with a list of Die objects.")
+
+                # raise ValueError if any Die in the list has different faces, or a different number of them
+                if not die._same_faces(dice[0]): raise ValueError("Dice must be similar (same number and names of faces).")
+
+            self._dice = dice
+            self._dice_set = None
+            self._dice_versions = None
+            n_dice = len(dice)
+
+        # One face table shared by every Die, so everything after this can work on codes
+        self._faces = self.get_dice_set().get_faces()
+        self._n_dice = n_dice
+        self._rng = _make_rng(seed)
+        self._last_codes = None
+        self._last_play = None
+
+        # Number of plays so far, and callbacks told about every new play
+        self._generation = 0
+        self._subscribers = []
+
+        # Play history: one growable code buffer (rows beyond _history_size are spare capacity) and the rows of each play
+        self._keep_history = keep_history
+        self._history = np.empty((0, n_dice), dtype = _code_dtype(len(self._faces)))
+        self._history_size = 0
+        self._history_plays = {}
+
+
+    def get_dice(self):
+        '''
+        Purpose:
+        Safely retrieve list of Die objects stored in the Game.
+
+        Inputs:
+        None.
+
+        Outputs:
+        dice : list of Die objects that the Gmae was instantiated with (made from the DiceSet if it was given one)
+        '''
+
+        if self._dice is None:
+            self._dice = self._dice_set.to_dice()
+            self._dice_versions = [die._version for die in self._dice]
+
+        return self._dice
+
+
+    def get_dice_set(self):
+        '''
+        Purpose:
+        Safely retrieve the DiceSet the Game rolls, rebuilding it from the Game's Die objects if any of their weights
+        changed since it was built.
+
+        Inputs:
+        None.
+
+        Outputs:
+        dice_set : DiceSet object of the Game's dice.
+        '''
+
+        if self._dice is not None:
+            versions = [die._version for die in self._dice]
+
+            if self._dice_set is None or versions != self._dice_versions:
+                self._dice_set = DiceSet.from_dice(self._dice)
+                self._dice_versions = versions
+
+        return self._dice_set
+    
+
+    def get_last_play(self, format = "wide"):
+        '''
+        Purpose:
+        Safely retrieve information on the last game played.
+
+        Inputs:
+        format : string "wide" or "narrow" to desribe the shape of the dataframe returned.
+                 "wide" or "w" will return the dataframe with row indexes representing Roll # and columns representing Die #.
+                 "narrow" or "n" will return the dataframe multi-indexed with level 1 representing Roll # and level 2 representing Die #.
+
+        Outputs:
+        last_play : pandas dataframe with results from the last game, in wide or narrow format as specified. Defaults to wide.
+                    Results are Categorical columns sharing the dice's faces as categories.
+        '''
+
+        if not isinstance(format, str):
+            raise TypeError("Argument must be a string")
+
+        inputs = ["narrow", "n", "wide", "w"]
+
+        if format not in inputs:
+            raise ValueError("Argument must be string 'narrow' or 'wide'")
+
+        # Apply face labels to the stored codes only when a data frame is asked for
+        if self._last_play is None and self._last_codes is not None:
+            self._last_play = self._codes_to_frame(self._last_codes)
+
+        df = self._last_play
+
+        if df is None: return df
+
+        if format == "narrow" or format == "n":
+            # Build the narrow frame straight from the codes: row-major codes are already in (Roll #, Die #) order
+            if self._last_codes is not None:
+                r, c = self._last_codes.shape
+                index = pd.MultiIndex.from_arrays([np.repeat(np.arange(1, r + 1), c), np.tile(np.arange(1, c + 1), r)],
+                                                  names = ["Roll #", "Die #"])
+                results = pd.Categorical.from_codes(self._last_codes.ravel(), dtype = pd.CategoricalDtype(self._faces))
+                df = pd.DataFrame({"Result" : results}, index = index)
+
+            # A last play that was only ever a data frame gets stacked
+            else:
+                df = pd.DataFrame(df.stack())
+                df.columns = ["Result"]
+
+        return df
+
+
+    def play(self, times=1, seed=None, workers=1, chunk_size=None):
+        '''
+        Purpose:
+        Simulate gameplay by getting results of a given number of rolls of the dice in the Game. Results are returned and stored in
+        the Game object, retrievable with the get_last_play() method. Only the most recent play is kept as the last play; a Game
+        created with keep_history=True also keeps every earlier play, retrievable with get_history().
+
+        Inputs:
+        times : int number of rolls in the game. Defaults to 1.
+        seed  : None, int, numpy SeedSequence or numpy Generator. If given, the rolls are drawn from it instead of the
+                Game's own generator, so the same seed always replays the same game. Defaults to None.
+        workers    : int number of processes to roll with, or None for one per CPU. With more than one worker the rolls are
+                     split into chunks that each get an independent stream spawned from seed. Defaults to 1 (no processes).
+        chunk_size : int number of rolls per chunk when workers > 1. A seeded parallel play gives the same results for any
+                     number of workers as long as chunk_size is the same. Defaults to 2**20.
+
+        Outputs:
+        results : pandas dataframe of the results of times rolls of the game's dice.        
+        '''
+
+        # Raise TypeError if passed a noninteger argument
+        if not isinstance(times, int): raise TypeError("Argument must be an integer.")
+
+        # Raise ValueError if passed times < 1
+        if times < 1: raise ValueError("Argument must be a positive integer.")
+
+        # Sample every die at once into an integer code matrix, then label it as a data frame
+        self.play_codes(times, seed, workers, chunk_size)
+
+        return self.get_last_play()
+
+
+    def play_codes(self, times=1, seed=None, workers=1, chunk_size=None):
+        '''
+        Purpose:
+        Simulate gameplay like play(), but return the results as an integer code matrix instead of a data frame. Code k stands
+        for the face at position k of the dice's faces (see get_faces()). The codes are stored as the last play, so the labeled
+        data frame is still available from get_last_play().
+
+        Inputs:
+        times : int number of rolls in the game. Defaults to 1.
+        seed       : None, int, numpy SeedSequence or numpy Generator, as in play(). Defaults to None.
+        workers    : int number of processes to roll with, or None for one per CPU, as in play(). Defaults to 1.
+        chunk_size : int number of rolls per chunk when workers > 1, as in play(). Defaults to 2**20.
+
+        Outputs:
+        codes : numpy array of shape (times, number of dice) with the face code rolled by each die in each roll.
+        '''
+
+        # Raise TypeError if passed a noninteger argument
+        if not isinstance(times, int): raise TypeError("Argument must be an integer.")
+
+        # Raise ValueError if passed times < 1
+        if times < 1: raise ValueError("Argument must be a positive integer.")
+
+        # Raise TypeError/ValueError if workers or chunk_size are not positive integers
+        if workers is None: workers = os.cpu_count() or 1
+        if chunk_size is None: chunk_size = _CHUNK_SIZE
+
+        if not isinstance(workers, int) or not isinstance(chunk_size, int):
+            raise TypeError("workers and chunk_size must be integers.")
+        if workers < 1 or chunk_size < 1:
+            raise ValueError("workers and chunk_size must be positive integers.")
+
+        rng = self._rng if seed is None else _make_rng(seed)
+        dice_set = self.get_dice_set()
+        codes = np.empty((times, self._n_dice), dtype = _code_dtype(len(self._faces)))
+
+        if workers == 1:
+            dice_set.sample(rng, codes)
+
+        else:
+            # One independent child stream per chunk; each worker sends back a compact code block
+            starts = range(0, times, chunk_size)
+            sizes = [min(chunk_size, times - start) for start in starts]
+            seeds = _spawn_seeds(rng, len(sizes))
+
+            with ProcessPoolExecutor(max_workers = min(workers, len(sizes))) as pool:
+                blocks = pool.map(_play_chunk, [dice_set] * len(sizes), sizes, [codes.dtype] * len(sizes), seeds)
+
+                for start, block in zip(starts, blocks):
+                    codes[start:start + len(block)] = block
+
+        self._store_play(codes)
+
+        return codes
+
+
+    async def play_async(self, times=1, seed=None, batch_size=None, executor=None, progress=None):
+        '''
+        Purpose:
+        Coroutine version of play() for use inside an asyncio event loop: the rolls are drawn in batches on an executor, so
+        the loop stays free while they run. Cancelling the task stops it between batches and leaves the last play as it
+        was. Each batch gets its own stream spawned from seed, exactly as in play() with more than one worker, so
+        play_async(times, seed, batch_size) gives the same rolls as play(times, seed, workers = 2, chunk_size = batch_size).
+
+        Inputs:
+        times      : int number of rolls in the game. Defaults to 1.
+        seed       : None, int, numpy SeedSequence or numpy Generator, as in play(). Defaults to None.
+        batch_size : int number of rolls per batch. Defaults to 2**20.
+        executor   : concurrent.futures executor to roll in, e.g. a thread or process pool shared by many requests, or
+                     None for the event loop's default executor. Defaults to None.
+        progress   : callable taking (rolls done, times), called after every batch; it may be a coroutine function.
+                     Defaults to None.
+
+        Outputs:
+        results : pandas dataframe of the results of times rolls of the game's dice, as returned by play().
+        '''
+
+        # Raise TypeError if passed noninteger arguments
+        if batch_size is None: batch_size = _CHUNK_SIZE
+        if not isinstance(times, int) or not isinstance(batch_size, int):
+            raise TypeError("times and batch_size must be integers.")
+
+        # Raise ValueError if passed times or batch_size < 1
+        if times < 1 or batch_size < 1: raise ValueError("times and batch_size must be positive integers.")
+
+        loop = asyncio.get_running_loop()
+        dice_set = self.get_dice_set()
+        codes = np.empty((times, self._n_dice), dtype = _code_dtype(len(self._faces)))
+
+        starts = range(0, times, batch_size)
+        seeds = _spawn_seeds(self._rng if seed is None else _make_rng(seed), len(starts))
+
+        for start, child in zip(starts, seeds):
+            # Awaiting one batch at a time is where a cancelled task stops
+            block = await loop.run_in_executor(executor, _play_chunk, dice_set, min(batch_size, times - start),
+                                               codes.dtype, child)
+            codes[start:start + len(block)] = block
+
+            if progress is not None:
+                report = progress(start + len(block), times)
+                if inspect.isawaitable(report): await report
+
+        self._store_play(codes)
+
+        return self.get_last_play()
+
+
+    def _store_play(self, codes):
+        '''
+        Purpose:
+        Make a code matrix the Game's last play: count the play, add it to the history and tell subscribers.
+
+        Inputs:
+        codes : numpy array of shape (rolls, number of dice) of face codes.
+
+        Outputs:
+        None.
+        '''
+
+        # Update last play; the data frame is built lazily by get_last_play()
+        self._last_codes = codes
+        self._last_play = None
+        self._generation += 1
+        if self._keep_history: self._append_history(codes)
+        self._notify(codes)
+
+
+    def iter_play(self, times, batch_size=None, seed=None):
+        '''
+        Purpose:
+        Simulate gameplay like play_codes(), but yield the results in batches instead of holding all of them at once, so memory
+        stays bounded no matter how many rolls are played. The batches are not stored as the last play; pass them to
+        Analyzer.consume() to analyze them.
+
+        Inputs:
+        times      : int total number of rolls.
+        batch_size : int number of rolls per batch (the last batch may be smaller). Defaults to 2**20.
+        seed       : None, int, numpy SeedSequence or numpy Generator, as in play(). Defaults to None.
+
+        Outputs:
+        batches : iterator of numpy arrays of shape (rolls in batch, number of dice) of face codes.
+        '''
+
+        # Raise TypeError if passed a noninteger argument
+        if not isinstance(times, int): raise TypeError("Argument must be an integer.")
+        if batch_size is None: batch_size = _CHUNK_SIZE
+        if not isinstance(batch_size, int): raise TypeError("batch_size must be an integer.")
+
+        # Raise ValueError if passed times or batch_size < 1
+        if times < 1 or batch_size < 1: raise ValueError("times and batch_size must be positive integers.")
+
+        # Checks above run right away; the rolling itself happens as the batches are requested
+        return self._iter_batches(times, batch_size, self._rng if seed is None else _make_rng(seed))
+
+
+    def _iter_batches(self, times, batch_size, rng):
+        '''
+        Purpose:
+        Generator behind iter_play().
+
+        Inputs:
+        times      : int total number of rolls.
+        batch_size : int number of rolls per batch.
+        rng        : numpy Generator.
+
+        Outputs:
+        batches : iterator of numpy arrays of face codes.
+        '''
+
+        dtype = _code_dtype(len(self._faces))
+
+        for start in range(0, times, batch_size):
+            batch = np.empty((min(batch_size, times - start), self._n_dice), dtype = dtype)
+            self.get_dice_set().sample(rng, batch)
+            yield batch
+
+
+    def get_generation(self):
+        '''
+        Purpose:
+        Safely retrieve how many times the Game has been played, so cached results can tell whether the last play changed.
+
+        Inputs:
+        None.
+
+        Outputs:
+        generation : int number of plays so far (play(), play_codes(), ...); 0 if the Game has not been played.
+        '''
+
+        return self._generation
+
+
+    def subscribe(self, callback):
+        '''
+        Purpose:
+        Register a function to be called with the codes of every new play. Batches streamed by iter_play() are not plays and
+        are not passed on; give them to Analyzer.consume() instead. Bound methods are held by weak reference, so subscribing
+        an object doesn't keep it alive.
+
+        Inputs:
+        callback : callable taking one numpy array of shape (rolls, number of dice) of face codes.
+
+        Outputs:
+        None.
+        '''
+
+        # raise TypeError if callback cannot be called
+        if not callable(callback): raise TypeError("Subscriber must be callable.")
+
+        self._subscribers.append(weakref.WeakMethod(callback) if inspect.ismethod(callback) else (lambda: callback))
+
+
+    def unsubscribe(self, callback):
+        '''
+        Purpose:
+        Stop calling a function registered with subscribe().
+
+        Inputs:
+        callback : callable previously passed to subscribe().
+
+        Outputs:
+        None.
+        '''
+
+        self._subscribers = [ref for ref in self._subscribers if ref() is not None and ref() != callback]
+
+
+    def _notify(self, codes):
+        '''
+        Purpose:
+        Pass new codes to every live subscriber, dropping the ones that have been garbage collected.
+
+        Inputs:
+        codes : numpy array of shape (rolls, number of dice) of face codes.
+
+        Outputs:
+        None.
+        '''
+
+        alive = []
+
+        for ref in self._subscribers:
+            callback = ref()
+
+            if callback is not None:
+                callback(codes)
+                alive.append(ref)
+
+        self._subscribers = alive
+
+
+    def _append_history(self, codes):
+        '''
+        Purpose:
+        Append the codes of the newest play to the history buffer, doubling its capacity when it is full.
+
+        Inputs:
+        codes : numpy array of shape (rolls, number of dice) of face codes.
+
+        Outputs:
+        None.
+        '''
+
+        start, stop = self._history_size, self._history_size + len(codes)
+
+        if stop > len(self._history):
+            grown = np.empty((max(stop, 2 * len(self._history)), self._history.shape[1]), dtype = self._history.dtype)
+            grown[:start] = self._history[:start]
+            self._history = grown
+
+        self._history[start:stop] = codes
+        self._history_size = stop
+        self._history_plays[self._generation] = (start, stop)
+
+
+    def play_to_file(self, path, times, batch_size=None, seed=None):
+        '''
+        Purpose:
+        Simulate gameplay straight into a file on disk, batch by batch, so games bigger than memory can be played once and
+        analyzed many times (see Game.from_file() and Analyzer.from_file()). The file holds a small header with the faces,
+        each die's weights, the seed and the shape, followed by the raw code matrix. The Game's last play is not changed.
+
+        Inputs:
+        path       : str path of the file to write (overwritten if it exists).
+        times      : int number of rolls in the game.
+        batch_size : int number of rolls generated and written at a time. Defaults to 2**20.
+        seed       : None, int or numpy SeedSequence. The header records it (or the fresh entropy used when it is None), so
+                     the same file can be regenerated with the same batch_size. A numpy Generator is accepted too, but
+                     then no seed can be recorded. Defaults to None.
+
+        Outputs:
+        path : str path of the written file.
+        '''
+
+        # Raise TypeError if passed a noninteger argument
+        if not isinstance(times, int): raise TypeError("Argument must be an integer.")
+        if batch_size is None: batch_size = _CHUNK_SIZE
+        if not isinstance(batch_size, int): raise TypeError("batch_size must be an integer.")
+
+        # Raise ValueError if passed times or batch_size < 1
+        if times < 1 or batch_size < 1: raise ValueError("times and batch_size must be positive integers.")
+
+        # Resolve the seed to something the header can record
+        if isinstance(seed, np.random.Generator):
+            recorded, rng = None, seed
+        else:
+            seed_seq = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+            recorded, rng = seed_seq.entropy, np.random.default_rng(seed_seq)
+
+        dice_set = self.get_dice_set()
+        dtype = _code_dtype(len(self._faces))
+        shape = (times, self._n_dice)
+
+        # raise TypeError if the faces can't be written to the header
+        try:
+            header = json.dumps({"faces" : self._faces.tolist(), "faces_dtype" : self._faces.dtype.str,
+                                 "weights" : dice_set.get_weights().tolist(), "seed" : recorded,
+                                 "batch_size" : batch_size, "shape" : shape,
+                                 "dtype" : dtype.str}).encode()
+        except TypeError:
+            raise TypeError("Faces must be strings or numbers to be written to a file.")
+
+        offset = -(-(len(_PLAY_FILE_MAGIC) + 8 + len(header)) // _PLAY_FILE_ALIGN) * _PLAY_FILE_ALIGN
+
+        with open(path, "wb") as f:
+            f.write(_PLAY_FILE_MAGIC + len(header).to_bytes(8, "little") + header)
+            f.truncate(offset + dtype.itemsize * times * self._n_dice)
+
+        codes = np.memmap(path, dtype = dtype, mode = "r+", offset = offset, shape = shape)
+
+        # Roll each batch straight into the file. This is not a play, so subscribers are not told about it; the rolls are
+        # the same as iter_play() would give for this seed and batch_size
+        for start in range(0, times, batch_size):
+            dice_set.sample(rng, codes[start:start + batch_size])
+
+        codes.flush()
+        del codes
+
+        return path
+
+
+    @staticmethod
+    def read_play_file(path):
+        '''
+        Purpose:
+        Open a file written by play_to_file() without reading its rolls into memory.
+
+        Inputs:
+        path : str path of the file.
+
+        Outputs:
+        (codes, header) : read-only numpy memmap of shape (rolls, number of dice) of face codes, and the header as a dict
+                          (faces, weights, seed, batch_size, shape, dtype).
+        '''
+
+        with open(path, "rb") as f:
+            # raise ValueError if this is not a play file
+            if f.read(len(_PLAY_FILE_MAGIC)) != _PLAY_FILE_MAGIC: raise ValueError("Not a play file.")
+
+            length = int.from_bytes(f.read(8), "little")
+            header = json.loads(f.read(length))
+
+        offset = -(-(len(_PLAY_FILE_MAGIC) + 8 + length) // _PLAY_FILE_ALIGN) * _PLAY_FILE_ALIGN
+        codes = np.memmap(path, dtype = np.dtype(header["dtype"]), mode = "r", offset = offset,
+                          shape = tuple(header["shape"]))
+
+        return codes, header
+
+
+    @classmethod
+    def from_file(cls, path):
+        '''
+        Purpose:
+        Rebuild a Game from a file written by play_to_file(), with the file's rolls as its last play. The rolls stay on disk
+        (memory-mapped, zero copy) until they are used.
+
+        Inputs:
+        path : str path of the file.
+
+        Outputs:
+        game : Game object with dice weighted as in the file and the file's rolls as its last play.
+        '''
+
+        codes, header = cls.read_play_file(path)
+        faces = np.array(header["faces"], dtype = np.dtype(header["faces_dtype"]))
+
+        game = cls(DiceSet(faces, np.array(header["weights"], dtype = np.float64).reshape(-1, len(faces))))
+        game._last_codes = codes
+        game._generation += 1
+
+        return game
+
+
+    def save_play(self, path, format=None, row_group_size=None):
+        '''
+        Purpose:
+        Save the last play to a file, compactly: as Parquet with one dictionary-encoded column per die (named "Die 1", "Die 2",
+        ...) in row groups, or as a plain .npz file of the code matrix when pyarrow isn't installed.
+
+        Inputs:
+        path           : str path of the file (".npz" is added to npz files that don't end with it).
+        format         : None, "parquet" or "npz". None picks Parquet when pyarrow is installed. Defaults to None.
+        row_group_size : int number of rolls per Parquet row group. Defaults to 2**20.
+
+        Outputs:
+        path : str path of the written file.
+        '''
+
+        codes = self.get_last_codes()
+
+        # raise ValueError if there is no play to save
+        if codes is None: raise ValueError("Game has not been played.")
+
+        return _save_table(path, self._faces, codes, format = format, row_group_size = row_group_size)
+
+
+    def load_play(self, path, dice=None):
+        '''
+        Purpose:
+        Load a play saved with save_play(). Loading every die makes the play the Game's last play; loading some of the dice
+        only reads their columns and leaves the last play alone.
+
+        Inputs:
+        path : str path of the file.
+        dice : list of int die numbers (starting at 1) to load, or None for every die. Defaults to None.
+
+        Outputs:
+        results : pandas data frame of the loaded rolls, with index Roll # and the loaded Die # as columns.
+        '''
+
+        codes, faces, _ = _load_table(path, dice)
+
+        # raise ValueError if the file was saved from dice with other faces
+        if len(faces) != len(self._faces) or (faces != self._faces).any():
+            raise ValueError("Saved play has different faces than the Game's dice.")
+
+        if dice is not None:
+            results = self._codes_to_frame(codes)
+            results.columns = pd.Index(dice, name = "Die #")
+            return results
+
+        # raise ValueError if the file has a different number of dice than the Game
+        if codes.shape[1] != self._n_dice: raise ValueError("Saved play has a different number of dice than the Game.")
+
+        self._store_play(codes)
+        return self.get_last_play()
+
+
+    def get_history(self, play_id=None, format="codes"):
+        '''
+        Purpose:
+        Safely retrieve earlier plays from the Game's history (see keep_history in __init__). Codes are returned as read-only
+        views of the history buffer, so no rolls are copied; faces are stored once, in get_faces().
+
+        Inputs:
+        play_id : int number of the play to retrieve (its Game generation: the first play is 1), or None for every play in
+                  the history back to back. Defaults to None.
+        format  : string "codes" for the integer code matrix or "wide" for a data frame like get_last_play(). Defaults to
+                  "codes".
+
+        Outputs:
+        history : numpy array of shape (rolls, number of dice) of face codes, or a pandas data frame if format is "wide".
+        '''
+
+        # raise ValueError if the Game isn't keeping a history, or if format is not one we know
+        if not self._keep_history: raise ValueError("Game was not created with keep_history=True.")
+        if format not in ["codes", "wide"]: raise ValueError("Format must be string 'codes' or 'wide'")
+
+        if play_id is None:
+            start, stop = 0, self._history_size
+
+        # raise IndexError if there is no such play in the history
+        elif play_id not in self._history_plays:
+            raise IndexError("No such play.")
+
+        else:
+            start, stop = self._history_plays[play_id]
+
+        codes = self._history[start:stop]
+        codes.flags.writeable = False
+
+        return codes if format == "codes" else self._codes_to_frame(codes)
+
+
+    def get_history_ids(self):
+        '''
+        Purpose:
+        Safely retrieve the numbers of the plays stored in the history, for use with get_history().
+
+        Inputs:
+        None.
+
+        Outputs:
+        play_ids : list of int play numbers, oldest first.
+        '''
+
+        return list(self._history_plays)
+
+
+    def get_last_codes(self):
+        '''
+        Purpose:
+        Safely retrieve the last play as an integer code matrix, the way play_codes() returns it.
+
+        Inputs:
+        None.
+
+        Outputs:
+        codes : numpy array of shape (rolls, number of dice) of face codes, or None if the Game has not been played.
+        '''
+
+        # A last play that only exists as a data frame is encoded against the Game's faces
+        if self._last_codes is None and self._last_play is not None:
+            codes = pd.Index(self._faces).get_indexer(self._last_play.to_numpy().ravel())
+
+            # raise ValueError if the data frame holds values that are not faces of the dice
+            if (codes < 0).any(): raise ValueError("Last play contains values that are not faces of the dice.")
+
+            self._last_codes = codes.astype(_code_dtype(len(self._faces))).reshape(self._last_play.shape)
+
+        return self._last_codes
+
+
+    def get_faces(self):
+        '''
+        Purpose:
+        Safely retrieve the faces shared by every Die in the Game, in code order.
+
+        Inputs:
+        None.
+
+        Outputs:
+        faces : numpy array of faces; code k in play_codes() results stands for faces[k].
+        '''
+
+        return self._faces
+
+
+    def _codes_to_frame(self, codes):
+        '''
+        Purpose:
+        Label an integer code matrix with the Game's faces, in the wide data frame format returned by play().
+
+        Inputs:
+        codes : numpy integer array of shape (rolls, number of dice).
+
+        Outputs:
+        results : pandas data frame with index Roll # and columns Die #, both starting at 1. Each column is a Categorical that
+                  keeps the codes as they are and shares one categories index (the faces), instead of one object per cell.
+        '''
+
+        r, c = codes.shape
+        dtype = pd.CategoricalDtype(self._faces)
+
+        results = pd.DataFrame({j + 1 : pd.Categorical.from_codes(codes[:, j], dtype = dtype) for j in range(c)},
+                               index = pd.RangeIndex(1, r + 1, name = "Roll #"))
+        results.columns = pd.RangeIndex(1, c + 1, name = "Die #")
+
+        return results
+
+
+
+######################################################################################################################
+###### Analysis helpers ##############################################################################################
+######################################################################################################################
+
+def _sort_rows(codes, faces):
+    '''
+    Purpose:
+    Sort each roll of a code matrix so the codes are in the order of their faces' values, making rolls with the same
+    faces in any order identical (the way combo_counts() groups them).
+
+    Inputs:
+    codes : numpy integer array of shape (rolls, number of dice).
+    faces : numpy array of faces the codes refer to.
+
+    Outputs:
+    codes : numpy integer array of the same shape with each row sorted.
+    '''
+
+    order = np.argsort(faces, kind = "stable")
+
+    # Faces already in sorted order: sorting the codes sorts the faces
+    if (order == np.arange(len(faces))).all():
+        return np.sort(codes, axis = 1)
+
+    # Otherwise sort by each face's rank and translate the ranks back into codes
+    rank = np.empty(len(faces), dtype = codes.dtype)
+    rank[order] = np.arange(len(faces), dtype = codes.dtype)
+
+    return order.astype(codes.dtype)[np.sort(rank[codes], axis = 1)]
+
+
+def _count_dtype(n):
+    '''
+    Purpose:
+    Pick the smallest signed integer dtype that can hold counts up to n.
+
+    Inputs:
+    n : int largest possible count (e.g. the number of dice in a roll).
+
+    Outputs:
+    dtype : numpy signed integer dtype.
+    '''
+
+    for dtype in (np.int8, np.int16, np.int32):
+        if n <= np.iinfo(dtype).max: return np.dtype(dtype)
+
+    return np.dtype(np.int64)
+
+
+def _face_count_matrix(codes, n_faces, rows_per_chunk=2**16):
+    '''
+    Purpose:
+    Count how many dice show each face in each roll of a code matrix with one bincount per chunk of rolls: offsetting
+    roll i's codes by i * n_faces gives every (roll, face) pair its own bin.
+
+    Inputs:
+    codes          : numpy integer array of shape (rolls, number of dice).
+    n_faces        : int number of faces.
+    rows_per_chunk : int number of rolls counted per bincount call, to bound the temporary offset array.
+
+    Outputs:
+    counts : numpy array of shape (rolls, n_faces), in the smallest dtype that can hold the number of dice.
+    '''
+
+    rolls, n_dice = codes.shape
+    counts = np.empty((rolls, n_faces), dtype = _count_dtype(n_dice))
+
+    for start in range(0, rolls, rows_per_chunk):
+        chunk = codes[start:start + rows_per_chunk]
+        offsets = np.arange(len(chunk), dtype = np.intp)[:, None] * n_faces
+        bins = np.bincount((chunk + offsets).ravel(), minlength = len(chunk) * n_faces)
+        counts[start:start + len(chunk)] = bins.reshape(len(chunk), n_faces)
+
+    return counts
+
+
+def _jackpot_mask(codes):
+    '''
+    Purpose:
+    Find the jackpots (every die showing the same face) in a code matrix by comparing every column to the first one.
+
+    Inputs:
+    codes : numpy integer array of shape (rolls, number of dice).
+
+    Outputs:
+    mask : numpy bool array of length rolls, True for jackpots.
+    '''
+
+    return (codes == codes[:, :1]).all(axis = 1)
+
+
+def _pack_rows(codes, n_faces):
+    '''
+    Purpose:
+    Pack each roll of a code matrix into a single sortable key, so distinct rolls can be counted without building tuples.
+    Rolls are read as mixed-radix numbers with base n_faces, giving one uint64 per roll; when n_faces ** n_dice doesn't
+    fit in 64 bits, each roll's raw bytes are viewed as one opaque (void) key instead.
+
+    Inputs:
+    codes   : numpy integer array of shape (rolls, number of dice).
+    n_faces : int number of faces.
+
+    Outputs:
+    keys : numpy array of length rolls, uint64 or void, equal exactly when the rolls are equal.
+    '''
+
+    rolls, n_dice = codes.shape
+
+    if n_faces ** n_dice <= 2**64:
+        keys = np.zeros(rolls, dtype = np.uint64)
+
+        for j in range(n_dice):
+            keys *= np.uint64(n_faces)
+            keys += codes[:, j].astype(np.uint64)
+
+        return keys
+
+    codes = np.ascontiguousarray(codes)
+    return codes.view(np.dtype((np.void, codes.dtype.itemsize * n_dice))).ravel()
+
+
+def _count_rows(codes, n_faces, counts=None):
+    '''
+    Purpose:
+    Count the distinct rolls in a code matrix by sorting their packed keys (see _pack_rows()).
+
+    Inputs:
+    codes   : numpy integer array of shape (rolls, number of dice).
+    n_faces : int number of faces.
+    counts  : numpy integer array of length rolls giving how many times each row was rolled, for merging tallies that
+              were already counted. Defaults to None (each row counts once).
+
+    Outputs:
+    rows   : numpy integer array of the distinct rolls, in order of first appearance.
+    counts : numpy int64 array with the number of times each of them was rolled.
+    '''
+
+    _, first, inverse, totals = np.unique(_pack_rows(codes, n_faces), return_index = True, return_inverse = True,
+                                          return_counts = True)
+
+    if counts is not None:
+        totals = np.zeros(len(first), dtype = np.int64)
+        np.add.at(totals, inverse.ravel(), counts)
+
+    order = np.argsort(first, kind = "stable")
+
+    return codes[first[order]], totals[order].astype(np.int64, copy = False)
+
+
+def _rows_frame(rows, counts, faces):
+    '''
+    Purpose:
+    Label distinct rolls with faces, in the format returned by combo_counts() and perm_counts().
+
+    Inputs:
+    rows   : numpy integer array of shape (distinct rolls, number of dice) of face codes.
+    counts : numpy integer array with the number of times each roll was rolled.
+    faces  : numpy array of faces the codes refer to.
+
+    Outputs:
+    counts : pandas data frame with one row per distinct roll (multiindexed by its faces) and a single column of counts.
+    '''
+
+    index = pd.MultiIndex.from_arrays([faces[rows[:, j]] for j in range(rows.shape[1])])
+
+    return pd.DataFrame({"Counts" : counts}, index = index)
+
+
+
+######################################################################################################################
+###### Storage helpers ###############################################################################################
+######################################################################################################################
+
+def _storage_format(format):
+    '''
+    Purpose:
+    Resolve the file format used to save plays and results.
+
+    Inputs:
+    format : None, "parquet" or "npz". None picks "parquet" when pyarrow is installed and "npz" otherwise.
+
+    Outputs:
+    format : str "parquet" or "npz".
+    '''
+
+    if format is None: return "npz" if pa is None else "parquet"
+
+    # raise ValueError for formats we don't write, and ImportError if Parquet is asked for without pyarrow
+    if format not in ["parquet", "npz"]: raise ValueError("Format must be 'parquet', 'npz' or None.")
+    if format == "parquet" and pa is None: raise ImportError("Saving as Parquet requires pyarrow.")
+
+    return format
+
+
+def _save_table(path, faces, codes=None, extra=None, format=None, row_group_size=None):
+    '''
+    Purpose:
+    Save a table of face codes (one column per die, named "Die 1", "Die 2", ...) and extra numeric columns. In Parquet the code
+    columns are dictionary-encoded against the faces and written in row groups; the .npz fallback stores the code matrix
+    as is. Either way the faces are stored once.
+
+    Inputs:
+    path           : str path of the file (".npz" is added to npz files that don't end with it).
+    faces          : numpy array of faces the codes refer to.
+    codes          : numpy integer array of shape (rows, number of dice), or None for a table with extra columns only.
+    extra          : dict of column name : numpy array of length rows. Defaults to None.
+    format         : None, "parquet" or "npz" (see _storage_format()). Defaults to None.
+    row_group_size : int number of rows per Parquet row group. Defaults to 2**20.
+
+    Outputs:
+    path : str path of the written file.
+    '''
+
+    format = _storage_format(format)
+    extra = extra or {}
+    faces = np.array(faces.tolist())
+    codes = np.empty((0, 0), dtype = np.uint8) if codes is None else codes
+
+    if format == "npz":
+        if not str(path).endswith(".npz"): path = str(path) + ".npz"
+        np.savez(path, faces = faces, codes = codes, extra_names = np.array(list(extra), dtype = str),
+                 **{f"extra_{k}" : v for k, v in enumerate(extra.values())})
+        return path
+
+    # Dictionary indices must be signed, so use the smallest signed type that holds every code
+    dictionary = pa.array(faces)
+    index_dtype = _count_dtype(len(faces))
+    columns = {f"Die {j + 1}" : pa.DictionaryArray.from_arrays(codes[:, j].astype(index_dtype), dictionary)
+               for j in range(codes.shape[1])}
+    columns.update({name : pa.array(values) for name, values in extra.items()})
+
+    table = pa.table(columns).replace_schema_metadata({"montecarlo" : json.dumps({"faces" : faces.tolist(),
+                                                                                 "faces_dtype" : faces.dtype.str})})
+    pq.write_table(table, path, row_group_size = row_group_size or _CHUNK_SIZE)
+
+    return path
+
+
+def _load_table(path, dice=None):
+    '''
+    Purpose:
+    Load a table written by _save_table(), reading only the code columns that are needed.
+
+    Inputs:
+    path : str path of the file.
+    dice : list of int die numbers (starting at 1) to load, or None for every die. Defaults to None.
+
+    Outputs:
+    (codes, faces, extra) : numpy integer array of shape (rows, number of dice loaded), numpy array of faces, and dict of
+                            extra column name : numpy array.
+    '''
+
+    if str(path).endswith(".npz"):
+        with np.load(path) as f:
+            codes, faces = f["codes"], f["faces"]
+            extra = {name : f[f"extra_{k}"] for k, name in enumerate(f["extra_names"].tolist())}
+
+        if dice is not None: codes = codes[:, [d - 1 for d in dice]]
+        return codes.astype(_code_dtype(len(faces)), copy = False), faces, extra
+
+    # raise ImportError if a Parquet file is read without pyarrow
+    if pq is None: raise ImportError("Loading Parquet files requires pyarrow.")
+
+    schema = pq.read_schema(path)
+    meta = json.loads(schema.metadata[b"montecarlo"])
+    faces = np.array(meta["faces"], dtype = np.dtype(meta["faces_dtype"]))
+
+    code_names = [name for name in schema.names if name.startswith("Die ")]
+    extra_names = [name for name in schema.names if not name.startswith("Die ")]
+    wanted = code_names if dice is None else [f"Die {d}" for d in dice]
+
+    # Column pruning: only the dice asked for (and the extra columns) are read from disk
+    table = pq.read_table(path, columns = wanted + extra_names)
+    codes = np.empty((table.num_rows, len(wanted)), dtype = _code_dtype(len(faces)))
+
+    for j, name in enumerate(wanted):
+        start = 0
+        for chunk in table.column(name).chunks:
+            if isinstance(chunk, pa.DictionaryArray):
+                # Map each chunk's dictionary back onto the stored faces in case a writer reordered it
+                lookup = pd.Index(faces).get_indexer(chunk.dictionary.to_numpy(zero_copy_only = False))
+                codes[start:start + len(chunk), j] = lookup[chunk.indices.to_numpy()]
+            else:
+                # Parquet readers only keep string dictionaries; numeric faces come back decoded
+                codes[start:start + len(chunk), j] = pd.Index(faces).get_indexer(chunk.to_numpy(zero_copy_only = False))
+
+            start += len(chunk)
+
+    extra = {name : table.column(name).to_numpy() for name in extra_names}
+
+    return codes, faces, extra
+
+
+
+######################################################################################################################
+###### WordIndex #####################################################################################################
+######################################################################################################################
+
+def _sortable_keys(codes, n_faces):
+    '''
+    Purpose:
+    Pack each row of a code matrix into a key that can be sorted and binary searched. Rows are read as mixed-radix numbers
+    with base n_faces like _pack_rows(), but rows too long for one uint64 are split over several uint64 fields of a
+    structured key (compared field by field) instead of becoming opaque bytes.
+
+    Inputs:
+    codes   : numpy integer array of shape (rows, row length).
+    n_faces : int number of faces.
+
+    Outputs:
+    keys : numpy array of length rows, uint64 or structured, equal exactly when the rows are equal and ordered like them.
+    '''
+
+    rows, length = codes.shape
+
+    # Most codes that fit in one uint64
+    per_key = 1
+    while per_key < length and n_faces ** (per_key + 1) <= 2**64:
+        per_key += 1
+
+    if per_key >= length: return _pack_rows(codes, n_faces)
+
+    starts = range(0, length, per_key)
+    keys = np.empty(rows, dtype = [(f"k{i}", np.uint64) for i in range(len(starts))])
+
+    for i, start in enumerate(starts):
+        keys[f"k{i}"] = _pack_rows(codes[:, start:start + per_key], n_faces)
+
+    return keys
+
+
+class WordIndex():
+    '''
+    WordIndex object holds a vocabulary of words spelled with the faces of a set of dice (e.g. letters), coded like rolls
+    and bucketed by length, so rolls can be checked against it without building strings.
+
+    Each word is split into its characters, so the faces should be single characters.
+    '''
+
+
+    def __init__(self, words, faces):
+        '''
+        Purpose:
+        Initializes a WordIndex from a list of words. Words with a character that isn't one of the faces can never be rolled
+        and are left out.
+
+        Inputs:
+        words : iterable of str words (matched exactly, so mind the case of the faces).
+        faces : numpy array of single-character faces the words are spelled with.
+
+        Outputs:
+        WordIndex object holding the words that can be spelled with the faces.
+        '''
+
+        # raise TypeError if faces are not a numpy array
+        if not isinstance(faces, np.ndarray):
+            raise TypeError("WordIndex must be initialized with a NumPy array of faces.")
+
+        # raise ValueError if faces are not unique
+        if not len(faces) == len(np.unique(faces)):
+            raise ValueError("Duplicate faces.")
+
+        self._faces = faces
+        self._keys = {}
+
+        buckets = {}
+        for word in words:
+            if word: buckets.setdefault(len(word), []).append(word)
+
+        lookup = pd.Index(faces)
+
+        for length, group in sorted(buckets.items()):
+            # Split every word of the bucket into characters at once, then code them against the faces
+            chars = np.array(group, dtype = f"U{length}").view("U1").reshape(len(group), length)
+            codes = lookup.get_indexer(chars.ravel()).reshape(chars.shape)
+            codes = codes[(codes >= 0).all(axis = 1)]
+
+            if len(codes): self._keys[length] = np.unique(_sortable_keys(codes, len(faces)))
+
+
+    @classmethod
+    def from_file(cls, path, faces, cache=None):
+        '''
+        Purpose:
+        Build a WordIndex from a word list file with one word per line (such as scrabble_words.txt). If a cache path is
+        given, the index is saved there and reused on later calls for as long as the word list and faces are unchanged.
+
+        Inputs:
+        path  : str path of the word list.
+        faces : numpy array of single-character faces the words are spelled with.
+        cache : str path of an .npz file to keep the built index in, or None to build it every time. Defaults to None.
+
+        Outputs:
+        index : WordIndex object.
+        '''
+
+        stat = os.stat(path)
+        source = [stat.st_size, stat.st_mtime_ns]
+
+        if cache is not None and os.path.exists(cache):
+            index, cached_source = cls._load(cache)
+
+            if cached_source == source and len(index._faces) == len(faces) and (index._faces == faces).all():
+                return index
+
+        with open(path) as f:
+            index = cls([line.strip() for line in f], faces)
+
+        if cache is not None: index.save(cache, source)
+
+        return index
+
+
+    def save(self, path, source=None):
+        '''
+        Purpose:
+        Save the index to an .npz file, to be loaded with load().
+
+        Inputs:
+        path   : str path of the file.
+        source : list [size, modification time] of the word list the index was built from, used by from_file() to tell
+                 whether a cached index is current. Defaults to None.
+
+        Outputs:
+        path : str path of the written file.
+        '''
+
+        np.savez(path, faces = np.array(self._faces.tolist()), lengths = np.array(list(self._keys), dtype = np.int64),
+                 source = np.array(source or [-1, -1], dtype = np.int64),
+                 **{f"keys_{length}" : keys for length, keys in self._keys.items()})
+
+        return path
+
+
+    @classmethod
+    def load(cls, path):
+        '''
+        Purpose:
+        Load an index saved with save().
+
+        Inputs:
+        path : str path of the file.
+
+        Outputs:
+        index : WordIndex object.
+        '''
+
+        return cls._load(path)[0]
+
+
+    @classmethod
+    def _load(cls, path):
+        '''
+        Purpose:
+        Load an index saved with save(), along with the word list details it was saved with.
+
+        Inputs:
+        path : str path of the file.
+
+        Outputs:
+        (index, source) : WordIndex object, and list [size, modification time] of its word list.
+        '''
+
+        with np.load(path) as f:
+            index = cls([], f["faces"])
+            index._keys = {length : f[f"keys_{length}"] for length in f["lengths"].tolist()}
+            source = f["source"].tolist()
+
+        return index, source
+
+
+    def __len__(self):
+        '''
+        Purpose:
+        Number of words in the index.
+        '''
+
+        return sum(len(keys) for keys in self._keys.values())
+
+
+    def get_faces(self):
+        '''
+        Purpose:
+        Safely retrieve the faces the words are coded with.
+
+        Inputs:
+        None.
+
+        Outputs:
+        faces : numpy array of faces.
+        '''
+
+        return self._faces
+
+
+    def get_lengths(self):
+        '''
+        Purpose:
+        Safely retrieve the lengths of the words in the index.
+
+        Inputs:
+        None.
+
+        Outputs:
+        lengths : sorted list of int word lengths.
+        '''
+
+        return list(self._keys)
+
+
+    def match(self, codes, faces=None):
+        '''
+        Purpose:
+        Check which rows of a code matrix (e.g. rolls of a Game) spell a word of the index, by binary search of their packed
+        keys in the bucket of words of that length.
+
+        Inputs:
+        codes : numpy integer array of shape (rows, number of dice) of face codes.
+        faces : numpy array of the faces the codes refer to, or None if they are the index's faces. Defaults to None.
+
+        Outputs:
+        matches : numpy bool array of length rows, True where the row spells a word.
+        '''
+
+        codes = np.asarray(codes)
+        keys = self._keys.get(codes.shape[1])
+
+        if keys is None or len(codes) == 0: return np.zeros(len(codes), dtype = bool)
+
+        # Recode from the caller's faces to the index's; faces the index doesn't have are never part of a word
+        if faces is not None and (len(faces) != len(self._faces) or (faces != self._faces).any()):
+            codes = pd.Index(self._faces).get_indexer(faces)[codes]
+            known = (codes >= 0).all(axis = 1)
+            matches = np.zeros(len(codes), dtype = bool)
+            matches[known] = self.match(codes[known])
+            return matches
+
+        found = _sortable_keys(codes, len(self._faces))
+        position = np.searchsorted(keys, found).clip(max = len(keys) - 1)
+
+        return keys[position] == found
+
+
+
+######################################################################################################################
+###### Analyzer ######################################################################################################
+######################################################################################################################
+
+class Analyzer():
+    '''
+    An Analyzer object takes the results of a single game and computes various descriptive statistical properties about it.
+    '''
+
+    def __init__(self, game, incremental=False):
+        '''
+        Purpose:
+        Initializes Analyzer object with a given game.
+
+        Inputs:
+        game        : Game object to be analyzed.
+        incremental : bool. If True, the Analyzer subscribes to the Game and merges every later play into running totals, as
+                      if each were passed to consume(). Batches streamed with iter_play() are only counted when they are
+                      passed to consume(). Defaults to False (analyze the Game's last play).
+
+        Outputs:
+        Analyzer object with the given Game.        
+        '''
+
+        # Raise ValueError if argument is not a Game object
+        if not isinstance(game, Game):
+            raise ValueError("Anlyzer must be initialized with a Game object")
+        
+        # Save state data
+        self._game = game
+        self._jackpots = None
+        self._face_counts = None
+        self._combos = None
+        self._perms = None
+        self._perm_rows = None
+
+        # Running totals over batches passed to consume()
+        self._streamed = False
+        self._stream_rolls = 0
+        self._stream_jackpots = 0
+        # Roll # of each consumed jackpot, kept only while every batch is consumed with keep_jackpot_rolls (None after)
+        self._stream_jackpot_rolls = [np.empty(0, dtype = np.intp)]
+        self._stream_faces = np.zeros(len(game.get_faces()), dtype = np.int64)
+        self._stream_combos = self._stream_perms = (np.empty((0, len(game.get_dice_set())), dtype = np.intp),
+                                                    np.empty(0, dtype = np.int64))
+
+        # Counts every change to the data behind the results; the cached results above belong to the Game's play number
+        # _cache_play and are dropped as soon as the Game is played again
+        self._generation = 0
+        self._cache_play = game.get_generation()
+
+        # Incremental Analyzers report on running totals from the start, even before the first play
+        if incremental:
+            self._streamed = True
+            game.subscribe(self._merge_play)
+
+
+    @classmethod
+    def from_file(cls, path, batch_size=None):
+        '''
+        Purpose:
+        Analyze a file written by Game.play_to_file() chunk by chunk, so the whole game never has to fit in memory. The
+        Analyzer reports on the file's rolls the way it reports on consumed batches (see consume()).
+
+        Inputs:
+        path       : str path of the file.
+        batch_size : int number of rolls read and analyzed at a time. Defaults to 2**20.
+
+        Outputs:
+        Analyzer object with every roll in the file consumed; get_game() returns the Game rebuilt from the file.
+        '''
+
+        game = Game.from_file(path)
+        codes = game.get_last_codes()
+        batch_size = batch_size or _CHUNK_SIZE
+
+        analyzer = cls(game)
+        analyzer.consume(codes[start:start + batch_size] for start in range(0, len(codes), batch_size))
+
+        return analyzer
+
+
+    def save_results(self, directory, format=None):
+        '''
+        Purpose:
+        Save face_counts(), combo_counts() and perm_counts() to files in a directory (face_counts.parquet, ... or .npz when
+        pyarrow isn't installed). Combinations and permutations are stored as face codes, with the faces stored once.
+        face_counts() needs a last play, so it is skipped for Analyzers that report on consumed batches.
+
+        Inputs:
+        directory : str path of the directory (created if it doesn't exist).
+        format    : None, "parquet" or "npz". None picks Parquet when pyarrow is installed. Defaults to None.
+
+        Outputs:
+        paths : dict of result name : str path of its file.
+        '''
+
+        os.makedirs(directory, exist_ok = True)
+        format = _storage_format(format)
+        faces = self._game.get_faces()
+        paths = {}
+
+        if not self._streamed:
+            counts = self.face_counts().to_numpy()
+            paths["face_counts"] = _save_table(os.path.join(directory, "face_counts." + format), faces,
+                                               extra = {f"Face {k}" : counts[:, k] for k in range(len(faces))}, format = format)
+
+        for name, frame in [("combo_counts", self.combo_counts()), ("perm_counts", self.perm_counts())]:
+            # Turn the face labels of each distinct roll back into codes
+            codes = np.stack([pd.Index(faces).get_indexer(frame.index.get_level_values(j))
+                              for j in range(frame.index.nlevels)], axis = 1)
+            paths[name] = _save_table(os.path.join(directory, name + "." + format), faces, codes,
+                                      extra = {"Counts" : frame["Counts"].to_numpy()}, format = format)
+
+        return paths
+
+
+    @staticmethod
+    def load_results(directory):
+        '''
+        Purpose:
+        Load results saved with save_results().
+
+        Inputs:
+        directory : str path of the directory.
+
+        Outputs:
+        results : dict of result name ("face_counts", "combo_counts", "perm_counts") : pandas data frame in the same format
+                  the Analyzer method returns.
+        '''
+
+        results = {}
+
+        for file in sorted(os.listdir(directory)):
+            name, _, ext = file.partition(".")
+            if name not in ["face_counts", "combo_counts", "perm_counts"] or ext not in ["parquet", "npz"]: continue
+
+            codes, faces, extra = _load_table(os.path.join(directory, file))
+
+            if name == "face_counts":
+                counts = np.stack([extra[f"Face {k}"] for k in range(len(faces))], axis = 1)
+                results[name] = pd.DataFrame(counts.astype(_count_dtype(counts.max(initial = 0))),
+                                             index = pd.RangeIndex(1, len(counts) + 1, name = "Roll #"),
+                                             columns = pd.Index(faces, name = "Face"))
+            else:
+                results[name] = _rows_frame(codes, extra["Counts"], faces)
+
+        return results
+
+
+    def get_generation(self):
+        '''
+        Purpose:
+        Safely retrieve the Analyzer's generation, a counter that goes up whenever the rolls behind its results change (a
+        new last play of the Game, or a batch consumed or merged incrementally). Results retrieved at the same generation
+        describe the same rolls.
+
+        Inputs:
+        None.
+
+        Outputs:
+        generation : int.
+        '''
+
+        self._check_cache()
+
+        return self._generation
+
+
+    def _check_cache(self):
+        '''
+        Purpose:
+        Drop results cached for the Game's last play if the Game has been played since they were computed.
+
+        Inputs:
+        None.
+
+        Outputs:
+        None.
+        '''
+
+        if self._cache_play != self._game.get_generation():
+            self._jackpots = self._face_counts = self._combos = self._perms = self._perm_rows = None
+            self._cache_play = self._game.get_generation()
+
+            # Only a change for Analyzers that report on the last play
+            if not self._streamed: self._generation += 1
+
+
+    def _merge_play(self, codes):
+        '''
+        Purpose:
+        Subscriber for incremental Analyzers: merge a new play of the Game into the running totals.
+
+        Inputs:
+        codes : numpy array of shape (rolls, number of dice) of face codes.
+
+        Outputs:
+        None.
+        '''
+
+        self.consume([codes])
+
+
+    def consume(self, batches, keep_jackpot_rolls=False):
+        '''
+        Purpose:
+        Analyze a stream of roll batches (e.g. from Game.iter_play()) one batch at a time, keeping only running totals so
+        memory stays bounded. Once consume() has been called, jackpot(), face_totals(), combo_counts() and perm_counts()
+        report on every roll consumed so far (across calls) instead of the Game's last play. face_counts() still needs the
+        whole last play, one row per roll.
+
+        Inputs:
+        batches            : iterable of numpy integer arrays of shape (rolls, number of dice) of face codes.
+        keep_jackpot_rolls : bool. If True, also keep the Roll # of every jackpot, for jackpot(return_rolls = True). This
+                             grows with the number of jackpots (about half the rolls of a 2 coin game), so memory is no
+                             longer bounded, and it only works if every batch consumed so far was kept. Defaults to False.
+
+        Outputs:
+        rolls : int total number of rolls consumed so far.
+        '''
+
+        faces = self._game.get_faces()
+        n_dice = len(self._game.get_dice_set())
+
+        for batch in batches:
+            batch = np.asarray(batch)
+
+            # Raise ValueError if a batch doesn't describe rolls of this Game's dice
+            if batch.ndim != 2 or batch.shape[1] != n_dice:
+                raise ValueError("Batches must have one column per die in the Game.")
+
+            jackpots = _jackpot_mask(batch)
+            self._stream_jackpots += int(jackpots.sum())
+
+            # Roll numbers are counted from 1 across batches; once a batch isn't kept, they can't be reported any more
+            if not keep_jackpot_rolls: self._stream_jackpot_rolls = None
+            elif self._stream_jackpot_rolls is not None:
+                self._stream_jackpot_rolls.append(np.flatnonzero(jackpots) + self._stream_rolls + 1)
+
+            self._streamed = True
+            self._stream_rolls += len(batch)
+            self._generation += 1
+            self._stream_faces += np.bincount(batch.ravel(), minlength = len(faces))
+            self._stream_perms = self._merge_tally(self._stream_perms, batch)
+            self._stream_combos = self._merge_tally(self._stream_combos, _sort_rows(batch, faces))
+
+        return self._stream_rolls
+
+
+    def _merge_tally(self, tally, batch):
+        '''
+        Purpose:
+        Count the distinct rolls in a batch and merge them into a running tally of distinct rolls and counts.
+
+        Inputs:
+        tally : tuple (rows, counts) as returned by _count_rows().
+        batch : numpy integer array of shape (rolls, number of dice).
+
+        Outputs:
+        tally : tuple (rows, counts) covering both.
+        '''
+
+        n_faces = len(self._game.get_faces())
+        rows, counts = _count_rows(batch, n_faces)
+
+        return _count_rows(np.concatenate([tally[0], rows]), n_faces, np.concatenate([tally[1], counts]))
+
+
+    def face_totals(self):
+        '''
+        Purpose:
+        Computes how many times each face was rolled in total, over every die and roll: the consumed rolls if consume() has
+        been called, the Game's last play otherwise.
+
+        Inputs:
+        None.
+
+        Outputs:
+        totals : pandas data frame indexed by Face with a single column of counts.
+        '''
+
+        faces = self._game.get_faces()
+
+        if self._streamed:
+            totals = self._stream_faces.copy()
+        else:
+            totals = np.bincount(self._game.get_last_codes().ravel(), minlength = len(faces))
+
+        return pd.DataFrame({"Counts" : totals}, index = pd.Index(faces, name = "Face"))
+
+
+    def get_game(self):
+        '''
+        Purpose:
+        Safely retrieve a copy of the Game object that the Analyzer was initialized with.
+
+        Inputs:
+        None.
+
+        Outputs:
+        Game object the Analyzer was initialized with.        
+        '''
+
+        return self._game
+    
+
+    def jackpot(self, return_rolls=False):
+        '''
+        Purpose:
+        Computes the number of times all Die objects 'rolled' the same face in a single roll, returning an integer value.
+
+        Inputs:
+        return_rolls : bool. If True, return the Roll # of every jackpot instead of only the count. Analyzers reporting on
+                       consumed batches need them consumed with keep_jackpot_rolls = True. Defaults to False.
+
+        Outputs:
+        jackpots : int representing number of times all dice rolled the same face, or a numpy array of the Roll # (starting
+                   at 1) of each jackpot if return_rolls is True.
+        '''
 
-######################################################################################################################
-###### Die ###########################################################################################################
-######################################################################################################################
+        self._check_cache()
 
-class Die:
-    '''
-    A Die object represents a stochastic object with a specified number of faces represented by unique symbols (str or numeric,
-    e.g. "H" and "T" for a coin or 1, 2, 3, 4, 5, and 6 for an actual die), each with a weight representing its probability
-    of being rolled.
+        # Report on the consumed stream, if there is one
+        if self._streamed:
+            if not return_rolls: return self._stream_jackpots
 
-    The object simulates a die (or coin, etc.) by randomly selecting from the faces a specified number of times and returning
-    a list of results (e.g. ["H", "H", "T", "H", "T"] for a coin flipped 5x).
+            # raise ValueError if some consumed batches didn't keep their jackpot rolls
+            if self._stream_jackpot_rolls is None:
+                raise ValueError("Jackpot rolls were not kept; pass keep_jackpot_rolls = True to every consume() call.")
 
-    The weights of the faces can be changed to create "unfair" dice.
-    '''
+            # Merge the kept batches once, so later calls don't concatenate them again
+            self._stream_jackpot_rolls = [np.concatenate(self._stream_jackpot_rolls)]
+            rolls = self._stream_jackpot_rolls[0]
+
+        else:
+            # Construct the result if it hasn't been already: a roll is a jackpot when every die matches the first one
+            if not isinstance(self._jackpots, np.ndarray):
+                self._jackpots = np.flatnonzero(_jackpot_mask(self._game.get_last_codes())) + 1
+
+            rolls = self._jackpots
 
+        return rolls.copy() if return_rolls else len(rolls)
+    
 
-    def __init__(self, faces):
+    def face_counts(self):
         '''
         Purpose:
-        Initializes Die object with a specified number of sides (which can represent a coin (2 sides),
-        an actual die (6 sides), etc.).
-
+        Computes how many times each face is rolled for each roll in a game, returning a data frame describing the faces rolled
+        in the Game.
+        
         Inputs:
-        faces : numpy array with distinct values representing each face (e.g. array(["Heads", "Tails"])
-                for a coin.)
-
+        None.
+        
         Outputs:
-        Die object with given number of sides and equal weights of 1.0 (a fair coin, die, etc.).
+        face_counts : pandas DataFrame describing the faces rolled in the Game, with index Roll # and face values as columns.
+                      Every face gets a column, even if it was never rolled.
         '''
+        # Return the result if it has already been constructed for the Game's last play
+        self._check_cache()
+        if isinstance(self._face_counts, pd.DataFrame): return self._face_counts
 
-        # raise TypeError if argument is not a numpy array
-        if not isinstance(faces, np.ndarray):
-            raise TypeError("Die must be initialized with a NumPy array.")
-        
-        # raise ValueEroor if faces are not unique
-        if not len(faces) == len(np.unique(faces)):
-            raise ValueError("Duplicate faces.")
+        # Get the results from the Game to work with as codes
+        codes = self._game.get_last_codes()
+        faces = self._game.get_faces()
 
+        # Count every (roll, face) pair at once; the dtype grows with the number of dice so counts can't overflow
+        counts = pd.DataFrame(_face_count_matrix(codes, len(faces)),
+                              index = pd.RangeIndex(1, len(codes) + 1, name = "Roll #"),
+                              columns = pd.Index(faces, name = "Face"))
 
-        # instantiate object faces array and equal weights
-        else:
-            self._state = pd.DataFrame({
-                "Weight" : np.ones(len(faces))},
-                index = faces)
-            
-            self._state.index.name = "Face"
+        # Store the result
+        self._face_counts = counts
+                          
+        return self._face_counts
 
-    def change_weight(self, face, new_weight):
+
+    async def face_counts_async(self, batch_size=None, executor=None, progress=None):
         '''
         Purpose:
-        Allows the user to change the weight of a given face to make the die "unfair".
+        Coroutine version of face_counts() for use inside an asyncio event loop: the rolls are counted in batches on an
+        executor, so the loop stays free while they run. Cancelling the task stops it between batches.
 
         Inputs:
-        face       : str or numeric representation of one of the faces
-        new_weight : new weight for that side (e.g. new_weight = 5 would make that face 5x more likely to be rolled
-                     if no other faces were changed)
+        batch_size : int number of rolls per batch. Defaults to 2**20.
+        executor   : concurrent.futures thread pool to count in, or None for the event loop's default executor. Defaults to
+                     None.
+        progress   : callable taking (rolls done, total rolls), called after every batch; it may be a coroutine function.
+                     Defaults to None.
 
         Outputs:
-        None (in-place change of Die object's state attribute).
+        face_counts : pandas DataFrame as returned by face_counts().
         '''
 
-        # raise IndexError if the face given is not part of the Die
-        if face not in self._state.index:
-            raise IndexError("No such face.")
-        
-        # raise TypeError if weight cannot be interpreted as numeric
-        try:
-            float(new_weight)
-        except:
-            raise TypeError("New weight must be numeric")
-        
-        # change weight
-        self._state.loc[face, "Weight"] = new_weight
+        # Return the result if it has already been constructed for the Game's last play
+        self._check_cache()
+        if isinstance(self._face_counts, pd.DataFrame): return self._face_counts
+
+        if batch_size is None: batch_size = _CHUNK_SIZE
 
+        # Raise TypeError/ValueError if batch_size is not a positive integer
+        if not isinstance(batch_size, int): raise TypeError("batch_size must be an integer.")
+        if batch_size < 1: raise ValueError("batch_size must be a positive integer.")
 
-    def roll(self, times=1):
+        loop = asyncio.get_running_loop()
+        play = self._game.get_generation()
+        codes = self._game.get_last_codes()
+        faces = self._game.get_faces()
+        matrix = np.empty((len(codes), len(faces)), dtype = _count_dtype(codes.shape[1]))
+
+        for start in range(0, len(codes), batch_size):
+            batch = codes[start:start + batch_size]
+            matrix[start:start + len(batch)] = await loop.run_in_executor(executor, _face_count_matrix, batch, len(faces))
+
+            if progress is not None:
+                report = progress(start + len(batch), len(codes))
+                if inspect.isawaitable(report): await report
+
+        counts = pd.DataFrame(matrix, index = pd.RangeIndex(1, len(codes) + 1, name = "Roll #"),
+                              columns = pd.Index(faces, name = "Face"))
+
+        # Only cache the result if the Game wasn't played again while it was being counted
+        if self._game.get_generation() == play: self._face_counts = counts
+
+        return counts
+    
+
+    def combo_counts(self):
         '''
         Purpose:
-        Simulates rolling the die a given number of times, returning a list of outcomes of the rolls without storing
-        the results.
-
+        Computes distinct combinations (regardless of order) of faces rolled and reports them along with their counts in a pandas data frame.
+        Distinct combinations are described in a Multiindex with a single column of counts.
+        
         Inputs:
-        times : int number of rolls to be recorded
-
+        None.
+        
         Outputs:
-        outcomes : list of length(times) of the results of the rolls
+        combos : pandas data frame of all distinct combinations and their counts.
         '''
 
-        # raise TypeError if times is not an integer
-        try:
-            int(times)
-        except:
-            raise TypeError("Argument must be an integer.")
+        self._check_cache()
+
+        # Report on the consumed stream, if there is one
+        if self._streamed: return _rows_frame(*self._stream_combos, self._game.get_faces())
+
+        # Retreive results if it has already ben calculated
+        if isinstance(self._combos, pd.DataFrame): return self._combos
         
-        # return a list with times number of values randomlly chosen from the die, with applied weights, without saving in memory
-        return list(np.random.choice(self._state.index, size=times, replace=True, p=self._state["Weight"]/self._state["Weight"].sum()))
+        # Get the results from the game as codes, sorted by face so that order doesn't matter
+        faces = self._game.get_faces()
+        codes = _sort_rows(self._game.get_last_codes(), faces)
 
+        # Count distinct combinations by their packed keys and store them as a multiindexed data frame
+        self._combos = _rows_frame(*_count_rows(codes, len(faces)), faces)
 
-    def get_state(self):
+        return self._combos
+
+
+    def perm_counts(self):
         '''
-        Purpose:
-        Safely access the state object of the Die, which holds the names and weights of each face in a pandas data frame.
+        Purpose: Computes the distinct (ordered) permutations of faces rolled and reports them along with their counts in a
+        pandas data frame. Distinct combinations are described in a multiindex with a single column of counts.
 
         Inputs:
         None.
 
         Outputs:
-        state: pandas data frame with names and weights of each face of the Die object.
+        perms : pandas data frame of all distinct permutations and their counts.
         '''
-        return self._state
-        
-
 
+        self._check_cache()
 
+        # Report on the consumed stream, if there is one
+        if self._streamed: return _rows_frame(*self._stream_perms, self._game.get_faces())
 
+        # Retrieve result if it has already been calculated
+        if isinstance(self._perms, pd.DataFrame): return self._perms
 
-######################################################################################################################
-###### Game ##########################################################################################################
-######################################################################################################################
+        # Store the distinct permutations as a multiindexed data frame
+        self._perms = _rows_frame(*self._perm_tally(), self._game.get_faces())
 
-class Game():
-    '''
-    Game object takes one or more dice (of the Die class) with the same number and names of faces and simulates rolling them.  
-    '''
+        return self._perms
 
 
-    def __init__(self, dice):
+    def _perm_tally(self):
         '''
         Purpose:
-        Initializes a Game object with a given list of dice.
+        Count the distinct permutations rolled, as codes.
 
         Inputs:
-        dice : list of Die objects with the same number and labels of faces.
+        None.
 
         Outputs:
-        Game object with the given dice.        
+        (rows, counts) : numpy integer array of the distinct rolls as face codes, and numpy int64 array of their counts.
         '''
 
-        # raise TypeError if the object passed to the initializer is not a list
-        if not isinstance(dice, list):
-            raise TypeError("Game object must be instantiated with a list.")
-        
+        self._check_cache()
 
-        for die in dice:
-            # raise TypeError if any element of the list is not a Die object
-            if not isinstance(die, Die): raise TypeError("Game object must be instantiated with a list of Die objects.")
+        if self._streamed: return self._stream_perms
 
-            # verify the list components are similar dice
-            faces = dice[0].get_state().index               # this Index object should hold the same values for every Die in the list
-                                                            # This variable will be assigned for each iteration but I think it's worth
-                                                            # it for code clarity and it saves me from having to iterate through the
-                                                            # list of dice two times
-            for i in range(0, len(faces)):
-                # raise ValueError if any Die in the list has a different index values
-                if die.get_state().index[i] != faces[i]: raise ValueError("Dice must be similar (same number and names of faces).")
+        # Count distinct permutations of the coded results by their packed keys
+        if self._perm_rows is None:
+            self._perm_rows = _count_rows(self._game.get_last_codes(), len(self._game.get_faces()))
 
-        self._dice = dice
-        self._last_play = None
+        return self._perm_rows
 
 
-    def get_dice(self):
+    def word_counts(self, index):
         '''
         Purpose:
-        Safely retrieve list of Die objects stored in the Game.
+        Finds the distinct permutations rolled that spell a word of a vocabulary, with their counts. The permutations are
+        matched as codes against the WordIndex, so only the words found are ever built as strings.
 
         Inputs:
-        None.
+        index : WordIndex object of the vocabulary, e.g. WordIndex.from_file("scrabble_words.txt", faces).
 
         Outputs:
-        dice : list of Die objects that the Gmae was instantiated with
+        words : pandas data frame indexed by Word, with a single column of counts, in order of first appearance.
         '''
 
-        return self._dice
-    
+        # raise TypeError if not given a WordIndex
+        if not isinstance(index, WordIndex): raise TypeError("word_counts must be given a WordIndex.")
 
-    def get_last_play(self, format = "wide"):
+        rows, counts = self._perm_tally()
+        faces = self._game.get_faces()
+
+        matches = index.match(rows, faces)
+        words = ["".join(word) for word in faces[rows[matches]].astype(str).tolist()]
+
+        return pd.DataFrame({"Counts" : counts[matches]}, index = pd.Index(words, name = "Word", dtype = object))
+
+
+    def estimate(self, statistic="jackpot", face=None, rel_error=0.05, confidence=0.95, batch_size=None, max_rolls=10**8,
+                 seed=None):
         '''
         Purpose:
-        Safely retrieve information on the last game played.
+        Play the Game in batches until a statistic is known to a given relative error, instead of guessing how many rolls
+        to play. After each batch the running estimate gets a normal-approximation confidence interval, and the next batch
+        is sized from it to about the number of rolls still needed. Only running sums are kept: the rolls are neither
+        stored as the Game's last play nor added to consume()'s totals, and incremental Analyzers subscribed to the Game
+        don't see them.
 
         Inputs:
-        format : string "wide" or "narrow" to desribe the shape of the dataframe returned.
-                 "wide" or "w" will return the dataframe with row indexes representing Roll # and columns representing Die #.
-                 "narrow" or "n" will return the dataframe multi-indexed with level 1 representing Roll # and level 2 representing Die #.
+        statistic  : "jackpot" for the probability that a roll is a jackpot, or "face" for the expected share of the dice
+                     showing face in a roll. Defaults to "jackpot".
+        face       : the face to estimate the share of, for statistic "face". Defaults to None.
+        rel_error  : float target half-width of the confidence interval, relative to the estimate. Defaults to 0.05.
+        confidence : float confidence level of the interval, between 0 and 1. Defaults to 0.95.
+        batch_size : int number of rolls in the first batch (and the fewest in later ones). Defaults to 2**16.
+        max_rolls  : int most rolls to play before giving up. Defaults to 10**8.
+        seed       : None, int, numpy SeedSequence or numpy Generator, as in Game.play(). Defaults to None.
 
         Outputs:
-        last_play : pandas dataframe with results from the last game, in wide or narrow format as specified. Defaults to wide.    
+        result : dict with the estimate, std_error, ci_low and ci_high of the interval, the relative_error reached, the
+                 number of rolls played and whether the target was reached (converged).
         '''
 
-        if not isinstance(format, str):
-            raise TypeError("Argument must be a string")
+        faces = self._game.get_faces()
 
-        inputs = ["narrow", "n", "wide", "w"]
+        # raise ValueError for unknown statistics, and IndexError for faces the dice don't have
+        if statistic not in ["jackpot", "face"]: raise ValueError("statistic must be 'jackpot' or 'face'.")
+        if statistic == "face" and face not in faces.tolist(): raise IndexError("No such face.")
 
-        if format not in inputs:
-            raise ValueError("Argument must be string 'narrow' or 'wide'")
+        # raise ValueError if the precision asked for can't be reached
+        if not rel_error > 0 or not 0 < confidence < 1:
+            raise ValueError("rel_error must be positive and confidence between 0 and 1.")
 
-        df = self._last_play
+        # raise TypeError/ValueError if max_rolls is not a positive integer
+        if not isinstance(max_rolls, int): raise TypeError("max_rolls must be an integer.")
+        if max_rolls < 1: raise ValueError("max_rolls must be a positive integer.")
 
-        if format == "narrow" or format == "n":
-            df = pd.DataFrame(df.stack())
-            df.columns = ["Result"]
+        batch_size = batch_size or 2**16
+        z = statistics.NormalDist().inv_cdf((1 + confidence) / 2)
+        code = faces.tolist().index(face) if statistic == "face" else None
 
-        return df
+        # Roll with the Game's DiceSet directly: these rolls are not a play, so subscribers (incremental Analyzers, including
+        # this one) must not see them. Without a seed, draw from the Game's own generator, as play() does
+        dice_set = self._game.get_dice_set()
+        dtype = _code_dtype(len(faces))
+        rng = self._game._rng if seed is None else _make_rng(seed)
+
+        # Running sums of the per-roll values (a 0/1 jackpot flag, or the share of the dice showing the face)
+        rolls, total, squares = 0, 0.0, 0.0
+        mean = se = 0.0
+        relative = math.inf
+        planned = min(batch_size, max_rolls)
+
+        while True:
+            for start in range(0, planned, _CHUNK_SIZE):
+                batch = np.empty((min(_CHUNK_SIZE, planned - start), len(dice_set)), dtype = dtype)
+                dice_set.sample(rng, batch)
+
+                if code is None:
+                    values = _jackpot_mask(batch)
+                else:
+                    values = (batch == code).sum(axis = 1) / batch.shape[1]
+
+                rolls += len(values)
+                total += float(values.sum())
+                squares += float(np.square(values, dtype = np.float64).sum())
+
+            mean = total / rolls
+            se = math.sqrt(max(squares / rolls - mean**2, 0.0) / max(rolls - 1, 1))
+            relative = z * se / mean if mean > 0 else math.inf
+
+            if relative <= rel_error or rolls >= max_rolls: break
+
+            # The interval narrows like 1 / sqrt(rolls): plan the rest in one go, growing at most tenfold per batch (and
+            # doubling while nothing has been seen yet)
+            needed = rolls * (relative / rel_error)**2 if math.isfinite(relative) else 2 * rolls
+            planned = int(min(max(needed - rolls, batch_size), 10 * rolls, max_rolls - rolls))
 
+        return {"estimate" : mean, "std_error" : se, "ci_low" : mean - z * se, "ci_high" : mean + z * se,
+                "relative_error" : relative, "rolls" : rolls, "converged" : relative <= rel_error}
 
-    def play(self, times=1):
+
+    def rare_jackpot(self, rolls=10**5, tilt=0.9, method="stratified", seed=None):
         '''
         Purpose:
-        Simulate gameplay by getting results of a given number of rolls of the dice in the Game. Results are returned and stored in
-        the Game object, retrievable with the get_last_play() method. Only the most recent play is recorded; play history is lost.
+        Estimate the probability of a jackpot when it is too rare for jackpot() to see any, by importance sampling: the
+        Game's dice are rolled with weights tilted toward one face, and each jackpot rolled is reweighted by its likelihood
+        ratio (its probability with the real weights over its probability with the tilted ones), so the estimate stays
+        unbiased. Tilting die j toward face f mixes its probabilities p_j with a sure f: (1 - tilt) * p_j + tilt on f.
 
         Inputs:
-        times : int number of rolls in the game. Defaults to 1.
+        rolls  : int total number of tilted rolls, at least two per face for method "stratified". Defaults to 10**5.
+        tilt   : float between 0 (the real weights, i.e. naive Monte Carlo) and 1 (every roll a jackpot on the face tilted
+                 toward). Defaults to 0.9.
+        method : "stratified" to split the rolls evenly over the faces, tilting every die toward that face and counting only
+                 its jackpots, or "mixture" to pick the face to tilt toward at random for each roll. Defaults to
+                 "stratified".
+        seed   : None, int, numpy SeedSequence or numpy Generator, as in Game.play(). Defaults to None.
 
         Outputs:
-        results : pandas dataframe of the results of times rolls of the game's dice.        
+        result : dict with the estimate of the jackpot probability, its std_error and the number of rolls used.
         '''
 
-        # Raise TypeError if passed a noninteger argument
-        if not isinstance(times, int): raise TypeError("Argument must be an integer.")
+        # Raise TypeError/ValueError if rolls is not a positive integer
+        if not isinstance(rolls, int): raise TypeError("rolls must be an integer.")
+        if rolls < 1: raise ValueError("rolls must be a positive integer.")
+
+        # raise ValueError for tilts outside [0, 1] and unknown methods
+        if not 0 <= tilt <= 1: raise ValueError("tilt must be between 0 and 1.")
+        if method not in ["stratified", "mixture"]: raise ValueError("method must be 'stratified' or 'mixture'.")
+
+        dice_set = self._game.get_dice_set()
+        faces = dice_set.get_faces()
+        weights = dice_set.get_weights()
+        probs = weights / weights.sum(axis = 1, keepdims = True)
+        n_dice, n_faces = probs.shape
+
+        # raise ValueError if a stratum would get fewer than 2 rolls, too few to estimate its mean and standard error
+        if method == "stratified" and rolls < 2 * n_faces:
+            raise ValueError("rolls must be at least twice the number of faces for method 'stratified'.")
+
+        # Without a seed, draw from the Game's own generator, as play() does
+        rng = self._game._rng if seed is None else _make_rng(seed)
+
+        # Probability of a jackpot on each face with the real weights, tilted toward that face, and tilted toward another
+        real = probs.prod(axis = 0)
+        toward = ((1 - tilt) * probs + tilt).prod(axis = 0)
+        away = ((1 - tilt) * probs).prod(axis = 0)
+
+        if method == "stratified":
+            # Stratum f only counts jackpots on f, each worth real[f] / toward[f]
+            sizes = np.full(n_faces, rolls // n_faces)
+            sizes[:rolls % n_faces] += 1
+            ratio = np.divide(real, toward, out = np.zeros(n_faces), where = toward > 0)
+        else:
+            # A jackpot on g can come from any stratum, so its tilted probability is averaged over the face tilted toward
+            sizes = rng.multinomial(rolls, np.full(n_faces, 1 / n_faces))
+            mixed = (toward + (n_faces - 1) * away) / n_faces
+            ratio = np.divide(real, mixed, out = np.zeros(n_faces), where = mixed > 0)
+
+        hits = np.zeros(n_faces, dtype = np.int64)
+        dtype = _code_dtype(n_faces)
+
+        for f in np.flatnonzero(sizes):
+            tilted = (1 - tilt) * probs
+            tilted[:, f] += tilt
+            stratum = DiceSet(faces, tilted)
+
+            for start in range(0, sizes[f], _CHUNK_SIZE):
+                codes = np.empty((min(_CHUNK_SIZE, sizes[f] - start), n_dice), dtype = dtype)
+                stratum.sample(rng, codes)
+
+                jackpots = codes[_jackpot_mask(codes), 0]
+                if method == "stratified": jackpots = jackpots[jackpots == f]
+                hits += np.bincount(jackpots, minlength = n_faces)
+
+        if method == "stratified":
+            # Sum of the strata, each a mean of 0 / ratio values
+            rate = hits / sizes
+            estimate = float((ratio * rate).sum())
+            se = float(np.sqrt((ratio**2 * rate * (1 - rate) / (sizes - 1)).sum()))
+        else:
+            # One mean over every roll, each worth ratio[g] for a jackpot on g and 0 otherwise
+            estimate = float((ratio * hits).sum() / rolls)
+            se = float(np.sqrt(max((ratio**2 * hits).sum() / rolls - estimate**2, 0.0) / max(rolls - 1, 1)))
+
+        return {"estimate" : estimate, "std_error" : se, "rolls" : rolls}
 
-        # Raise ValueError if passed times < 1
-        if times < 1: raise ValueError("Argument must be a positive integer.")
 
-        results = pd.DataFrame([d.roll(times) for d in self._dice])
 
-        # Format the data frame the way we want it
-        results = results.transpose(copy = False)
-        
-        # Set indexes to start at 1
-        r, c = results.shape
-        results.index = [i + 1 for i in range(0, r)]
-        results.columns = [i + 1 for i in range(0, c)]
 
-        # Name indexes appropriately
-        results.index.name = "Roll #"
-        results.columns.name = "Die #"
 
-        # Update last_play and return results
-        self._last_play = results
-        return results
 
 
 
 ######################################################################################################################
-###### Analyzer ######################################################################################################
+###### ExactAnalyzer #################################################################################################
 ######################################################################################################################
 
-class Analyzer():
+class ExactAnalyzer():
     '''
-    An Analyzer object takes the results of a single game and computes various descriptive statistical properties about it.
+    An ExactAnalyzer object computes the exact probabilities behind the statistics an Analyzer estimates, straight from the
+    weights of a Game's dice and without rolling them. Multiply a probability by the number of rolls to get the expected
+    count an Analyzer would report for a game of that length.
     '''
 
-    def __init__(self, game):
+    def __init__(self, game, max_outcomes=10**6):
         '''
         Purpose:
-        Initializes Analyzer object with a given game.
+        Initializes ExactAnalyzer object with a given game.
 
         Inputs:
-        game : Game object to be analyzed.
+        game         : Game object whose dice are analyzed (the Game does not need to have been played).
+        max_outcomes : int largest number of distinct combinations or permutations combo_counts() and perm_counts() will
+                       enumerate before raising ValueError. Defaults to 10**6.
 
         Outputs:
-        Analyzer object with the given Game.        
+        ExactAnalyzer object with the given Game.
         '''
 
         # Raise ValueError if argument is not a Game object
         if not isinstance(game, Game):
-            raise ValueError("Anlyzer must be initialized with a Game object")
-        
-        # Save state data
+            raise ValueError("ExactAnalyzer must be initialized with a Game object")
+
         self._game = game
-        self._jackpots = None
-        self._face_counts = None
-        self._combos = None
-        self._perms = None
+        self._max_outcomes = max_outcomes
 
 
     def get_game(self):
         '''
         Purpose:
-        Safely retrieve a copy of the Game object that the Analyzer was initialized with.
+        Safely retrieve the Game object that the ExactAnalyzer was initialized with.
 
         Inputs:
         None.
 
         Outputs:
-        Game object the Analyzer was initialized with.        
+        Game object the ExactAnalyzer was initialized with.
         '''
 
         return self._game
-    
 
-    def jackpot(self):
+
+    def _probabilities(self):
         '''
         Purpose:
-        Computes the number of times all Die objects 'rolled' the same face in a single roll, returning an integer value.
+        Collect the normalized weights of every Die in the Game.
 
         Inputs:
         None.
 
         Outputs:
-        jackpots : int representing number of times all dice rolled the same face.
+        probs : numpy float array of shape (number of dice, number of faces); row j holds die j's face probabilities.
         '''
-        # Return the result if it has already been constructed# 
-        if isinstance(self._jackpots, int): return self._jackpots
 
-        # Instantiate a counter
-        jackpots = 0
+        weights = self._game.get_dice_set().get_weights()
 
-        # Iterate over rows of the last_play data frame to see how many unique values
-        for value in self._game.get_last_play().nunique(axis = 1):
-            # When nunique = 1, that's a jackpot!
-            if value == 1: jackpots += 1
-            
-        # Store state data
-        self._jackpots = jackpots
+        return weights / weights.sum(axis = 1, keepdims = True)
+
+
+    def jackpot(self):
+        '''
+        Purpose:
+        Computes the probability that all dice roll the same face in a single roll.
+
+        Inputs:
+        None.
+
+        Outputs:
+        probability : float probability of a jackpot.
+        '''
+
+        # A jackpot on face f needs every die to roll f
+        return float(self._probabilities().prod(axis = 0).sum())
 
-        return jackpots
-    
 
     def face_counts(self):
         '''
         Purpose:
-        Computes how many times each face is rolled for each roll in a game, returning a data frame describing the faces rolled
-        in the Game.
-        
+        Computes the distribution of how many dice show each face in a single roll, by convolving the dice one at a time.
+
         Inputs:
         None.
-        
+
         Outputs:
-        face_counts : pandas DataFrame describing the faces rolled in the Game, with index Roll # and face values as columns.
+        face_counts : pandas data frame with index Count (0 to the number of dice) and face values as columns; each column
+                      holds the probability that exactly Count dice show that face.
         '''
-        # Return the result if it has already been constructed
-        if isinstance(self._face_counts, pd.DataFrame): return self._face_counts
 
-        # Get the results from the Game to work with
-        g = self._game.get_last_play()
+        probs = self._probabilities()
+        n_dice, n_faces = probs.shape
 
-        # Construct data frame from value counts for each row (Roll #)
-        counts = pd.DataFrame([g.loc[i].value_counts() for i in range(1, len(g.index) + 1)])
+        # dist[f, k] = probability that k of the dice so far show face f
+        dist = np.zeros((n_faces, n_dice + 1))
+        dist[:, 0] = 1.0
 
-        # Clean up NaN's and convert to int
-        counts = counts.fillna(value = 0).astype(np.int8)
+        for p in probs:
+            dist[:, 1:] = dist[:, 1:] * (1 - p)[:, None] + dist[:, :-1] * p[:, None]
+            dist[:, 0] *= 1 - p
+
+        return pd.DataFrame(dist.T, index = pd.RangeIndex(n_dice + 1, name = "Count"),
+                            columns = pd.Index(self._game.get_faces(), name = "Face"))
 
-        # Store the result
-        self._face_counts = counts
-                          
-        return self._face_counts
-    
 
     def combo_counts(self):
         '''
         Purpose:
-        Computes distinct combinations (regardless of order) of faces rolled and reports them along with their counts in a pandas data frame.
-        Distinct combinations are described in a Multiindex with a single column of counts.
-        
+        Computes the probability of every distinct combination (regardless of order) of faces in a single roll. Dice are
+        added one at a time, and each combination's probability is memoized so it is only computed once.
+
         Inputs:
         None.
-        
+
         Outputs:
-        combos : pandas data frame of all distinct combinations and their counts.
+        combos : pandas data frame of all combinations, multiindexed by their faces like Analyzer.combo_counts(), with a
+                 single column of probabilities.
         '''
 
-        # Retreive results if it has already ben calculated
-        if isinstance(self._combos, pd.DataFrame): return self._combos
-        
-        # Get the results from the game to work with sorted so that order doesn't matter
-        g = np.sort(self._game.get_last_play().to_numpy(), axis = 1)
-
-        # Standardize order of results (sort along axis 1) and store in hashable tuples      
-        results = [tuple(result) for result in g]
+        probs = self._probabilities()
+        n_dice, n_faces = probs.shape
+        faces = self._game.get_faces()
 
-        # Construct dictionary of result : count pairs
-        d = {}
+        # raise ValueError if there are too many combinations to list
+        if math.comb(n_dice + n_faces - 1, n_dice) > self._max_outcomes:
+            raise ValueError("Too many combinations to enumerate; raise max_outcomes to allow it.")
 
-        for result in results:
-            
-            # If not in d, add with count 1
-            if result not in d:
-                d[result] = 1
+        # Combination (sorted tuple of codes) : probability, one die at a time. A combination's probability after adding a
+        # die is the sum, over each face the new die could have rolled, of the smaller combination's probability.
+        combos = {() : 1.0}
 
-            # Else increment the count
-            else:
-                d[result] += 1
+        for p in probs:
+            grown = {}
 
-        # Store the dictionary as a multiindexed data frame
-        self._combos = pd.DataFrame(d.values(), index = d.keys(), columns = ["Counts"])
+            for combo, prob in combos.items():
+                for face in range(n_faces):
+                    key = list(combo)
+                    bisect.insort(key, face)
+                    key = tuple(key)
+                    grown[key] = grown.get(key, 0.0) + prob * p[face]
 
-        return self._combos
+            combos = grown
 
+        rows = np.array(list(combos.keys()), dtype = np.intp).reshape(len(combos), n_dice)
 
-        # Multiindex includes faces and counts
+        # Relabel in face-value order, the way Analyzer.combo_counts() sorts combinations
+        frame = _rows_frame(_sort_rows(rows, faces), np.array(list(combos.values())), faces)
+        return frame.rename(columns = {"Counts" : "Probability"})
 
 
     def perm_counts(self):
         '''
-        Purpose: Computes the distinct (ordered) permutations of faces rolled and reports them along with their counts in a
-        pandas data frame. Distinct combinations are described in a multiindex with a single column of counts.
+        Purpose:
+        Computes the probability of every distinct (ordered) permutation of faces in a single roll.
 
         Inputs:
         None.
 
         Outputs:
-        perms : pandas data frame of all distinct permutations and their counts.
+        perms : pandas data frame of all permutations, multiindexed by their faces like Analyzer.perm_counts(), with a
+                single column of probabilities.
         '''
 
-        # Retrieve result if it has already been calculated
-        if isinstance(self._perms, pd.DataFrame): return self._perms
+        probs = self._probabilities()
+        n_dice, n_faces = probs.shape
 
-        # Get results as a list of hashable tuples
-        g = self._game.get_last_play().to_numpy()
-        results = [tuple(result) for result in g]
+        # raise ValueError if there are too many permutations to list
+        if n_faces ** n_dice > self._max_outcomes:
+            raise ValueError("Too many permutations to enumerate; raise max_outcomes to allow it.")
 
-        # Construct dictionary of result : count pairs
-        d = {}
+        # Every permutation as a row of codes, and its probability as the product of each die's face probability
+        rows = np.stack(np.unravel_index(np.arange(n_faces ** n_dice), (n_faces,) * n_dice), axis = 1)
+        values = probs[np.arange(n_dice), rows].prod(axis = 1)
 
-        for result in results:
-            
-            # If not in d, add with count 1
-            if result not in d:
-                d[result] = 1
+        frame = _rows_frame(rows, values, self._game.get_faces())
+        return frame.rename(columns = {"Counts" : "Probability"})
 
-            # Else increment the count
-            else:
-                d[result] += 1
 
-        # Store the dictionary as a multiindexed data frame
-        self._perms = pd.DataFrame(d.values(), index = d.keys(), columns = ["Counts"])
 
-        return self._perms
 
 
 
+######################################################################################################################
+###### Sweeps ########################################################################################################
+######################################################################################################################
+
+def _sweep_config(faces, weights, n_dice, times, seed):
+    '''
+    Purpose:
+    Worker for sweep(): play one configuration (n_dice dice with the same weights) from the shared seed and summarize it.
+
+    Inputs:
+    faces   : numpy array of faces.
+    weights : numpy float array of one weight per face.
+    n_dice  : int number of dice.
+    times   : int number of rolls.
+    seed    : numpy SeedSequence shared by every configuration.
+
+    Outputs:
+    (jackpots, face_totals, top_combo, top_count) : int number of jackpots, numpy int64 array of how many times each face
+                                                    was rolled, numpy array of the codes of the most common combination,
+                                                    and its count.
+    '''
+
+    dice_set = DiceSet(faces, np.tile(weights, (n_dice, 1)))
+    n_faces = len(faces)
+
+    # Die j draws from the j-th child of the shared seed, so it sees the same draws in every configuration, whatever its
+    # number of dice. The children are built directly rather than with seed.spawn(), which would advance the shared seed
+    rngs = [np.random.default_rng(np.random.SeedSequence(seed.entropy, spawn_key = seed.spawn_key + (j,),
+                                                         pool_size = seed.pool_size)) for j in range(n_dice)]
+
+    jackpots = 0
+    totals = np.zeros(n_faces, dtype = np.int64)
+    combos = (np.empty((0, n_dice), dtype = np.intp), np.empty(0, dtype = np.int64))
+
+    for start in range(0, times, _CHUNK_SIZE):
+        rolls = min(_CHUNK_SIZE, times - start)
+
+        u = np.empty((rolls, n_dice), order = "F")
+        for j, rng in enumerate(rngs): rng.random(out = u[:, j])
+        codes = np.empty((rolls, n_dice), dtype = _code_dtype(n_faces))
+        dice_set._inverse_cdf(u, codes)
+
+        jackpots += int(_jackpot_mask(codes).sum())
+        totals += np.bincount(codes.ravel(), minlength = n_faces)
+
+        rows, counts = _count_rows(_sort_rows(codes, faces), n_faces)
+        combos = _count_rows(np.concatenate([combos[0], rows]), n_faces, np.concatenate([combos[1], counts]))
+
+    top = int(np.argmax(combos[1]))
+
+    return jackpots, totals, combos[0][top], int(combos[1][top])
+
+
+def sweep(faces, weights, n_dice, times, seed=None, workers=1):
+    '''
+    Purpose:
+    Play and analyze a grid of configurations, one per pair of a weight vector and a number of dice (every die of a
+    configuration gets those weights). Every configuration is rolled from the same seed by inverting its dice's cumulative
+    weights, with die j drawing the same uniforms in every configuration (common random numbers), so differences between
+    configurations come from their weights, not from luck.
+
+    Inputs:
+    faces   : numpy array with distinct values representing each face.
+    weights : list of array-likes, each with one weight per face.
+    n_dice  : list of int numbers of dice.
+    times   : int number of rolls per configuration.
+    seed    : None, int, numpy SeedSequence or numpy Generator shared by every configuration. Defaults to None.
+    workers : int number of processes to play the configurations in, or None for one per CPU. Defaults to 1.
+
+    Outputs:
+    results : pandas data frame with one row per configuration (indexed by Config #): its Weights and Dice, the Jackpot
+              rate, the mean count per roll of each face (columns "Mean <face>"), the Top combo (tuple of faces) and its
+              Top combo count.
+    '''
+
+    # raise TypeError if faces are not a numpy array
+    if not isinstance(faces, np.ndarray): raise TypeError("Faces must be a NumPy array.")
+
+    # raise TypeError/ValueError if times is not a positive integer
+    if not isinstance(times, int): raise TypeError("times must be an integer.")
+    if times < 1: raise ValueError("times must be a positive integer.")
+
+    # raise ValueError if a weight vector doesn't have one weight per face, or a number of dice is not positive
+    weights = [np.array(w, dtype = np.float64) for w in weights]
+    if any(w.shape != faces.shape for w in weights): raise ValueError("Each weight vector must have one weight per face.")
+    if any(n < 1 for n in n_dice): raise ValueError("Numbers of dice must be positive.")
+
+    if workers is None: workers = os.cpu_count() or 1
+
+    configs = [(w, n) for w in weights for n in n_dice]
+    shared = _spawn_seeds(seed, 1)[0]
+    args = ([faces] * len(configs), [w for w, _ in configs], [n for _, n in configs], [times] * len(configs),
+            [shared] * len(configs))
+
+    if workers == 1 or len(configs) == 1:
+        summaries = list(map(_sweep_config, *args))
+    else:
+        with ProcessPoolExecutor(max_workers = min(workers, len(configs))) as pool:
+            summaries = list(pool.map(_sweep_config, *args))
 
+    rows = []
+    for (w, n), (jackpots, totals, top, top_count) in zip(configs, summaries):
+        row = {"Weights" : tuple(w.tolist()), "Dice" : n, "Jackpot rate" : jackpots / times}
+        row.update({f"Mean {face}" : total / times for face, total in zip(faces.tolist(), totals.tolist())})
+        row.update({"Top combo" : tuple(faces[top].tolist()), "Top combo count" : top_count})
+        rows.append(row)
 
+    return pd.DataFrame(rows, index = pd.RangeIndex(len(rows), name = "Config #"))
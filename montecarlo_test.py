@@ -1,9 +1,20 @@
 import pandas as pd
 import numpy as np
-from montecarlo import Die, Game, Analyzer
+from montecarlo import Die, DiceSet, Game, Analyzer, ExactAnalyzer, WordIndex, sweep
 import unittest
+import asyncio
+import os
+import tempfile
+import importlib.util
+import inspect
+import pickle
+import subprocess
+import sys
 
 
+# Parquet tests only run where the optional pyarrow dependency is installed
+has_pyarrow = importlib.util.find_spec("pyarrow") is not None
+
 # Some convenience initializer functions
 die = lambda : Die(np.array([1, 2, 3, 4, 5, 6]))
 coin = lambda : Die(np.array(["H", "T"]))
@@ -86,6 +97,49 @@ class DieTester(unittest.TestCase):
     ## Another good test is the fact that all of my other tests work with get_state()
     
 
+    ###########################
+    ## Tests for from_counts ##
+    ###########################
+
+    def test_from_counts_file(self):
+        '''Ensure from_counts builds a Die weighted by the counts in a file'''
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "letters.txt")
+            with open(path, "w") as f: f.write("E 529117365\nT 390965105\nNA 12\n")
+
+            d = Die.from_counts(path)
+
+        assert d.get_state().index.tolist() == ["E", "T", "NA"], "from_counts read the wrong faces"
+        assert d.get_state()["Weight"].tolist() == [529117365, 390965105, 12], "from_counts read the wrong weights"
+
+
+    def test_from_counts_mapping(self):
+        '''Ensure from_counts gives the same Die as change_weight called once per face'''
+
+        counts = {"H" : 3, "T" : 1}
+
+        d = coin()
+        for face, count in counts.items(): d.change_weight(face, count)
+
+        assert Die.from_counts(counts).get_state().equals(d.get_state()), "from_counts differs from change_weight"
+        assert Die.from_counts(pd.Series(counts)).get_state().equals(d.get_state()), "from_counts failed with a Series"
+
+
+    def test_from_counts_type_error(self):
+        '''Ensure from_counts raises TypeError if the counts are not numeric'''
+
+        # Try to build a Die with counts that are not numbers
+        try:
+            Die.from_counts({"H" : "often", "T" : 1})
+            # If the above works, this test should fail
+            assert 1 == 0, "from_counts ran with nonnumeric counts"
+
+        # When the above fails, it should raise TypeError
+        except Exception as t:
+            assert isinstance(t, TypeError), "from_counts raised the wrong error when passed nonnumeric counts"
+
+
     #############################
     ## Tests for change_weight ##
     #############################
@@ -135,6 +189,78 @@ class DieTester(unittest.TestCase):
         assert d.get_state().loc[2, "Weight"] == 3, "change_weight failed to change weight correctly"
 
 
+    def test_change_weight_state_refresh(self):
+        '''Ensure get_state reflects a weight change made after the state was first retrieved'''
+
+        # Instantiate a Die object and look at its state before changing it
+        d = coin()
+        d.get_state()
+
+        d.change_weight("T", "2.5")
+
+        assert d.get_state().loc["T", "Weight"] == 2.5, "get_state returned stale weights after change_weight"
+
+
+    ##############################
+    ## Tests for change_weights ##
+    ##############################
+
+    def test_change_weights(self):
+        '''Ensure change_weights gives the same Die as change_weight called once per face'''
+
+        d = die()
+        for face, weight in {2 : 5, 6 : 0.5}.items(): d.change_weight(face, weight)
+
+        mapped = die()
+        mapped.change_weights({2 : 5, 6 : 0.5})
+        assert mapped.get_state().equals(d.get_state()), "change_weights with a dict differs from change_weight"
+
+        full = die()
+        full.change_weights([1, 5, 1, 1, 1, 0.5])
+        assert full.get_state().equals(d.get_state()), "change_weights with an array differs from change_weight"
+
+
+    def test_change_weights_atomic(self):
+        '''Ensure change_weights raises IndexError for a face not in the Die, without changing any weight'''
+
+        d = die()
+
+        # Try to change the weights of an existing and a nonexistant face
+        try:
+            d.change_weights({1 : 3, 7 : 2})
+            # If the above works, this test should fail
+            assert 1 == 0, "change_weights ran with a nonexistent face"
+
+        # When the above fails, it should raise IndexError and leave the weights alone
+        except Exception as i:
+            assert isinstance(i, IndexError), "change_weights raised the wrong error when passed a nonexistant face"
+            assert (d.get_state()["Weight"] == 1).all(), "change_weights changed weights before failing"
+
+
+    def test_change_weights_value_error(self):
+        '''Ensure change_weights raises ValueError if an array doesn't have one weight per face'''
+
+        # Try to change the weights with too few of them
+        try:
+            die().change_weights([1, 2, 3])
+            # If the above works, this test should fail
+            assert 1 == 0, "change_weights ran with too few weights"
+
+        # When the above fails, it should raise ValueError
+        except Exception as v:
+            assert isinstance(v, ValueError), "change_weights raised the wrong error when passed too few weights"
+
+
+    def test_change_weights_resamples(self):
+        '''Ensure rolls follow the weights set by change_weights after the sampler was built'''
+
+        d = die()
+        d.roll(10)
+        d.change_weights([0, 0, 0, 0, 0, 1])
+
+        assert d.roll(20) == [6] * 20, "roll used the weights from before change_weights"
+
+
     ####################
     ## Tests for roll ##
     ####################
@@ -156,6 +282,72 @@ class DieTester(unittest.TestCase):
             assert isinstance(t, TypeError), "roll raised the wrong error when passed invalid input"
 
     
+    def test_roll_seed(self):
+        '''Ensure roll gives the same outcomes for the same seed'''
+
+        # Two separate dice seeded alike should agree, and so should an explicit seed passed to roll
+        assert Die(np.arange(10), seed = 7).roll(50) == Die(np.arange(10), seed = 7).roll(50), "seeded dice disagree"
+        assert die().roll(50, seed = 3) == die().roll(50, seed = 3), "roll with the same seed disagrees"
+
+
+    def test_init_seed_type_error(self):
+        '''Ensure __init__ raises TypeError when the seed cannot seed a generator'''
+
+        # Try to instantiate a Die object with bad input (string seed)
+        try:
+            Die(np.array([1, 2]), seed = "lucky")
+            # If the above works, this test should fail
+            assert 1 == 0, "__init__ worked with a string seed"
+
+        # When the above fails, it should raise a TypeError
+        except Exception as t:
+            assert isinstance(t, TypeError), "__init__ raised the wrong error when passed a string seed"
+
+
+    def test_roll_alias(self):
+        '''Ensure a many-faced Die rolls faces in proportion to their weights'''
+
+        # 26 faces is enough to use the alias table
+        d = Die(np.arange(26), seed = 0)
+        d.change_weight(0, 25)              # face 0 holds half of the total weight
+
+        share = np.mean(np.array(d.roll(20000)) == 0)
+        assert abs(share - 0.5) < 0.02, "roll did not follow the weights of a many-faced Die"
+
+
+    def test_roll_alias_rebuilt(self):
+        '''Ensure the alias table follows later calls to change_weight'''
+
+        d = Die(np.arange(26), seed = 0)
+        d.roll(10)                          # builds the alias table
+
+        # Once every other face has zero weight only face 5 can be rolled
+        for face in range(26):
+            if face != 5: d.change_weight(face, 0)
+
+        assert set(d.roll(100)) == {5}, "roll used a stale alias table after change_weight"
+
+
+    def test_roll_value_error(self):
+        '''Ensure roll raises ValueError when the weights are negative, not finite or all zero, for few and many faces'''
+
+        for n_faces in [3, 10]:
+            for face, weight in [(1, -5), (1, np.nan), (1, np.inf), (None, 0)]:
+                d = Die(np.arange(1, n_faces + 1))
+                if face is None: d.change_weights(np.zeros(n_faces))
+                else: d.change_weight(face, weight)
+
+                # Try to roll the die with bad weights
+                try:
+                    d.roll(10)
+                    # If the above works, this test should fail
+                    assert 1 == 0, f"roll ran with weight {weight} on {n_faces} faces"
+
+                # When the above fails, it should raise ValueError
+                except Exception as v:
+                    assert isinstance(v, ValueError), f"roll raised the wrong error with weight {weight} on {n_faces} faces"
+
+
     def test_roll(self):
         '''Ensure roll returns a list of length(times)'''
 
@@ -234,6 +426,59 @@ class GameTester(unittest.TestCase):
             assert isinstance(v, ValueError), "Game raised other than ValueError when instantiated with dissimilar dice"
 
 
+    def test_init_value_error_hash_collision(self):
+        '''Ensure a Game compares the faces themselves, not only a hash of them (hash(-1) == hash(-2) in CPython)'''
+
+        # Try to instantiate a Game object with dice whose faces only differ by values that hash alike
+        try:
+            Game([Die(np.array([-1, 5])), Die(np.array([-2, 5]))])
+            # If the above works, this test should fail
+            assert 1 == 0, "Game instantiated with a list of dissimilar Die objects"
+
+        # When the above fails, it should raise a ValueError
+        except Exception as v:
+            assert isinstance(v, ValueError), "Game raised other than ValueError when instantiated with dissimilar dice"
+
+
+    def test_init_equal_faces(self):
+        '''Ensure dice with equal faces are similar whatever their dtype, or the process that made them'''
+
+        Game([Die(np.array([1, 2, 3], dtype = np.int32)), Die(np.array([1.0, 2.0, 3.0]))])
+        Game([Die(np.array(["H", "T"])), Die(np.array(["H", "T"], dtype = "<U5"))])
+
+        # A Die pickled in a process with another string hash seed
+        code = "import pickle, sys; import numpy as np; from montecarlo import Die; " \
+               "sys.stdout.buffer.write(pickle.dumps(Die(np.array(['H', 'T']))))"
+        out = subprocess.run([sys.executable, "-c", code], cwd = os.path.dirname(inspect.getfile(Die)), check = True,
+                             capture_output = True, env = dict(os.environ, PYTHONHASHSEED = "1")).stdout
+
+        Game([pickle.loads(out), coin()])
+
+
+    def test_init_value_error_fewer_faces(self):
+        '''Ensure a Game object raises ValueError when a Die has fewer or reordered faces'''
+
+        for other in [Die(np.array([1, 2, 3])), Die(np.array([6, 5, 4, 3, 2, 1]))]:
+            # Try to instantiate a Game object with dissimilar Die objects
+            try:
+                Game([die(), other])
+                # If the above works, this test should fail
+                assert 1 == 0, "Game instantiated with a list of dissimilar Die objects"
+
+            # When the above fails, it should raise a ValueError
+            except Exception as v:
+                assert isinstance(v, ValueError), "Game raised other than ValueError when instantiated with dissimilar dice"
+
+
+    def test_init_faces(self):
+        '''Ensure init stores one face table shared by the dice'''
+
+        faces = np.array(["x", "y", "z"])
+        g = Game([Die(faces) for i in range(1000)])
+
+        assert list(g.get_faces()) == ["x", "y", "z"], "Game stored the wrong faces"
+
+
     def test_init1(self):
         '''Ensure init instantiates a Game object'''
 
@@ -390,6 +635,26 @@ class GameTester(unittest.TestCase):
 
 
 
+    def test_get_last_play_categorical(self):
+        '''Ensure get_last_play returns Categorical columns sharing the faces as categories'''
+
+        g = game2()                       # 5 coins
+        g.play(10)
+
+        wide = g.get_last_play()
+        narrow = g.get_last_play("narrow")
+
+        for column in wide:
+            assert isinstance(wide[column].dtype, pd.CategoricalDtype), "get_last_play returned a non-categorical column"
+            assert list(wide[column].cat.categories) == ["H", "T"], "get_last_play returned the wrong categories"
+
+        # The narrow frame should hold the same results as stacking the wide one
+        assert isinstance(narrow["Result"].dtype, pd.CategoricalDtype), "get_last_play('narrow') is not categorical"
+        assert list(narrow["Result"].astype(str)) == list(wide.astype(str).stack()), "get_last_play('narrow') reordered results"
+        assert narrow.index.names == ["Roll #", "Die #"], "get_last_play('narrow') has the wrong index names"
+
+
+
     ####################
     ## Tests for play ##
     ####################
@@ -445,6 +710,25 @@ class GameTester(unittest.TestCase):
             assert isinstance(v, ValueError), "play failed to raise ValueError when passed negative input" 
 
 
+    def test_play_value_error_weights(self):
+        '''Ensure play raises ValueError when a die's weights are negative or all zero'''
+
+        for bad in ["negative", "zero"]:
+            g = game1()                     # 3 dice
+            if bad == "negative": g.get_dice()[1].change_weight(2, -5)
+            else: g.get_dice()[1].change_weights(np.zeros(6))
+
+            # Try to play game with bad weights
+            try:
+                g.play(10)
+                # If the above works, this test should fail
+                assert 1 == 0, f"play worked with {bad} weights"
+
+            # When the above fails, it should raise a ValueError
+            except Exception as v:
+                assert isinstance(v, ValueError), f"play failed to raise ValueError with {bad} weights"
+
+
     def test_play_df(self):
         '''Ensure play returns a pandas data frame'''
 
@@ -490,173 +774,1289 @@ class GameTester(unittest.TestCase):
 
 
 
-######################################################################################################################
-###### Analyzer Tests ################################################################################################
-######################################################################################################################
+    ##############################
+    ## Tests for get_last_codes ##
+    ##############################
 
-class AnalyzerTest(unittest.TestCase):
+    def test_get_last_codes(self):
+        '''Ensure get_last_codes encodes a last play that only exists as a data frame'''
 
-    ########################
-    ## Tests for __init__ ##
-    ########################
+        # Construct a fake last play
+        g = game2()                     # 5 coins
+        g._last_play = pd.DataFrame([["H", "T"], ["T", "T"]])
 
-    def test_init_value_error1(self):
-        '''Ensure __init__ raises ValueError when passed other than a Game object'''
+        assert (g.get_last_codes() == [[0, 1], [1, 1]]).all(), "get_last_codes encoded the last play incorrectly"
 
-        # Try to initialize with bad input
+
+    ###########################
+    ## Tests for get_history ##
+    ###########################
+
+    def test_get_history(self):
+        '''Ensure get_history keeps every play and slices them by play number'''
+
+        g = Game([die(), die(), die()], keep_history = True)
+
+        # Enough plays to grow the history buffer several times
+        plays = [g.play_codes(n) for n in [5, 1, 30, 7]]
+
+        assert g.get_history_ids() == [1, 2, 3, 4], "get_history_ids returned the wrong play numbers"
+        assert (g.get_history(3) == plays[2]).all(), "get_history returned the wrong play"
+        assert (g.get_history() == np.concatenate(plays)).all(), "get_history returned the wrong combined history"
+        assert g.get_history(2, format = "wide").shape == (1, 3), "get_history returned a data frame of the wrong shape"
+
+        # Views of the history should not be writable
+        assert not g.get_history().flags.writeable, "get_history returned a writable view"
+
+
+    def test_get_history_index_error(self):
+        '''Ensure get_history raises IndexError for a play that is not in the history'''
+
+        g = Game([coin()], keep_history = True)
+        g.play(3)
+
+        # Try to get a play that never happened
         try:
-            a = Analyzer("puppies")
+            g.get_history(2)
             # If the above works, this test should fail
-            assert 1 == 0, "__init__ ran with string input"
+            assert 1 == 0, "get_history returned a play that never happened"
 
-        # When the above fails, it should raise ValueError
-        except Exception as v:
-            assert isinstance(v, ValueError), "__init__ raised other than ValueError when passed string input"
+        # When the above fails, it should raise IndexError
+        except Exception as i:
+            assert isinstance(i, IndexError), "get_history raised other than IndexError for a missing play"
 
 
-    def test_init_value_error2(self):
-        '''Ensure __init__ raises ValueError when passed other than a Game object'''
+    def test_get_history_value_error(self):
+        '''Ensure get_history raises ValueError when the Game keeps no history'''
 
-        # Try to initialize with bad input
+        g = game1()
+        g.play(3)
+
+        # Try to get the history of a Game that doesn't keep one
         try:
-            a = Analyzer(100)
+            g.get_history()
             # If the above works, this test should fail
-            assert 1 == 0, "__init__ ran with integer input"
+            assert 1 == 0, "get_history worked without keep_history"
 
         # When the above fails, it should raise ValueError
         except Exception as v:
-            assert isinstance(v, ValueError), "__init__ raised other than ValueError when passed integer input"
+            assert isinstance(v, ValueError), "get_history raised other than ValueError without keep_history"
 
 
-    def test_init(self):
-        '''Ensure __init__ instantiates an Analyzer object with the correct Game object'''
+    ############################
+    ## Tests for play_to_file ##
+    ############################
 
-        # Initialize Analyzer object
-        a = Analyzer(game1())                        # 3 dice
-        g = a.get_game()
+    def test_play_to_file(self):
+        '''Ensure a game written with play_to_file reopens with the same dice and rolls'''
 
-        # Ensure the Analyzer has a Game object attribute
-        assert isinstance(g, Game), "Analyzer initiated without Game object"
+        c = coin()
+        c.change_weight("H", 4)
+        g = Game([c, coin(), c])
 
-        # Ensure the Game has a list of three Die objects
-        dice = g.get_dice()
+        with tempfile.TemporaryDirectory() as tmp:
+            path = g.play_to_file(os.path.join(tmp, "game.mcp"), 1000, batch_size = 300, seed = 9)
+            codes, header = Game.read_play_file(path)
 
-        assert len(dice) == 3, "Analyzer initiated with the wrong list of dice"
+            assert isinstance(codes, np.memmap) and codes.shape == (1000, 3), "read_play_file returned the wrong codes"
+            assert header["seed"] == 9 and header["weights"][0] == [4.0, 1.0], "play_to_file wrote the wrong header"
 
-        for d in dice:
-            assert isinstance(d, Die), "Analyser initiated with other than Die objects in Game"
+            # The same seed and batch size regenerate the same rolls
+            assert (np.concatenate(list(g.iter_play(1000, 300, seed = 9))) == codes).all(), "play_to_file rolls do not replay"
 
+            # A Game rebuilt from the file has the file's rolls as its last play
+            g2 = Game.from_file(path)
+            assert (g2.get_last_codes() == codes).all(), "from_file lost the rolls"
+            assert g2.get_dice()[0].get_state().loc["H", "Weight"] == 4, "from_file lost the weights"
+            assert g2.get_last_play().shape == (1000, 3), "from_file last play has the wrong shape"
+            del codes, g2
 
-    #######################
-    ## Tests for jackpot ##
-    #######################
 
-    def test_jackpot0(self):
-        '''Ensure jackpot returns an integer equal to the number of jackpots'''
+    def test_play_to_file_not_a_play(self):
+        '''Ensure play_to_file doesn't feed its rolls to incremental Analyzers or change the last play'''
 
-        # We will have to construct a fake last play here
-        g = game1()                     # 3 dice
-        g._last_play = pd.DataFrame([[2, 3, 4, 1, 4],        # 0 jackpots
-                                     [3, 2, 4, 5, 3],
-                                     [3, 3, 3, 4, 5]
-                                     ])
-        
-        # Make sure jackpot == 2
-        assert Analyzer(g).jackpot() == 0, "jackpot failed to return zero when there were no jackpots"
+        g = game1()
+        a = Analyzer(g, incremental = True)
 
+        with tempfile.TemporaryDirectory() as tmp:
+            g.play_to_file(os.path.join(tmp, "game.mcp"), 1000, seed = 9)
 
-    def test_jackpot1(self):
-        '''Ensure jackpot returns an integer equal to the number of jackpots'''
+        assert a.face_totals()["Counts"].sum() == 0, "play_to_file rolls were counted by an incremental Analyzer"
+        assert g.get_generation() == 0 and g.get_last_codes() is None, "play_to_file changed the last play"
 
-        # We will have to construct a fake last play here
-        g = game1()                     # 3 dice
-        g._last_play = pd.DataFrame([[1, 2, 3],
-                                     [4, 5, 6],
-                                     [3, 3, 3],
-                                     [6, 4, 2],
-                                     [4, 4, 4]])        # 2 jackpots
-        
-        # Make sure jackpot == 2
-        assert Analyzer(g).jackpot() == 2, "jackpot failed to return the correct number"
 
+    def test_read_play_file_value_error(self):
+        '''Ensure read_play_file raises ValueError for a file that play_to_file did not write'''
 
-    ###########################
-    ## Tests for face_counts ##
-    ###########################
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "notes.txt")
+            with open(path, "w") as f: f.write("not a game")
 
-    def test_face_counts    (self):
-        '''Ensure that face_counts returns a data frame with proper shape and values'''
+            # Try to open a file that is not a play file
+            try:
+                Game.read_play_file(path)
+                # If the above works, this test should fail
+                assert 1 == 0, "read_play_file opened a file that is not a play file"
 
-        # Initialize Analyzer object to work with
-        g = game1()                     # 3 dice
-        g.play(10)                      # 10 rolls
-        a = Analyzer(g)
+            # When the above fails, it should raise ValueError
+            except Exception as v:
+                assert isinstance(v, ValueError), "read_play_file raised other than ValueError for a bad file"
 
-        # face_counts should return a data frame of shape (10, 6): 10 rolls, 6 faces
-        assert a.face_counts().shape == (10, 6), "face_counts returned a data frame of the wrong shape"
-        
-        # Each row should add up to 3 (3 dice rolled therefore 3 faces to count)
-        for sum in a.face_counts().sum(axis = 1):
-            assert sum == 3, "face_counts returned inappropriate values"
 
+    #########################
+    ## Tests for save_play ##
+    #########################
 
-    ############################
-    ## Tests for combo_counts ##
-    ############################
+    def check_save_play(self, format):
+        '''Save a play in the given format and check that it loads back whole and by column'''
 
-    def tests_combo_counts(self):
-        '''Ensure combo_counts returns a data frame with appropriate results'''
-        g = game1()                 # 3 dice
-        g.play(100)                 # 100 rolls
+        g = game2()                     # 5 coins
+        g.play(50)
 
-        a = Analyzer(g)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = g.save_play(os.path.join(tmp, "play." + format), format = format, row_group_size = 16)
 
-        assert isinstance(a.combo_counts(), pd.DataFrame), "combo_counts failed to return a pandas data frame"
+            # Loading every die makes the play the new last play
+            g2 = game2()
+            assert g2.load_play(path).equals(g.get_last_play()), "load_play returned a different play"
+            assert (g2.get_last_codes() == g.get_last_codes()).all(), "load_play did not store the last play"
 
-        counts_local = a.combo_counts()["Counts"]
+            # Loading some dice only returns their columns
+            some = g2.load_play(path, dice = [2, 5])
+            assert list(some.columns) == [2, 5], "load_play returned the wrong dice"
+            assert (some.to_numpy() == g.get_last_play()[[2, 5]].to_numpy()).all(), "load_play returned the wrong rolls"
 
-        # Counts should add up to 100
-        assert sum(counts_local) == 100, "combo_counts failed to report the correct number of results"
 
-        # Length should be <=32 because there are only 56 combinations of 3 numbers 1-6
-        assert len(counts_local) <= 56, "combo_counts failed to consolidate unique permutations"
-      
+    def test_save_play_npz(self):
+        '''Ensure save_play and load_play round trip through the .npz fallback'''
+        self.check_save_play("npz")
 
 
+    @unittest.skipUnless(has_pyarrow, "pyarrow is not installed")
+    def test_save_play_parquet(self):
+        '''Ensure save_play and load_play round trip through Parquet'''
+        self.check_save_play("parquet")
 
-    ###########################
-    ## Tests for perm_counts ##
-    ###########################
 
-    def text_perm_counts(self):
-        '''Ensure perm_counts returns a data frame with appropriate results'''
-        g = game2()                 # 5 coins
-        g.play(40)                  # 40 rolls
+    def test_load_play_value_error(self):
+        '''Ensure load_play raises ValueError for a play of dice with other faces'''
 
-        a = Analyzer(g)
+        g = game1()                     # 3 dice
+        g.play(5)
 
-        assert isinstance(a.perm_counts(), pd.DataFrame), "perm_counts failed to return a pandas data frame"
+        with tempfile.TemporaryDirectory() as tmp:
+            path = g.save_play(os.path.join(tmp, "play.npz"), format = "npz")
 
-        counts_local = a.perm_counts()["Counts"]
+            # Try to load a dice play into a coin game
+            try:
+                game2().load_play(path)
+                # If the above works, this test should fail
+                assert 1 == 0, "load_play loaded a play of different dice"
 
-        # Counts should add up to 40
-        assert sum(counts_local) == 40, "perm_counts failed to report the correct number of results"
+            # When the above fails, it should raise ValueError
+            except Exception as v:
+                assert isinstance(v, ValueError), "load_play raised other than ValueError for different dice"
 
-        # Length should be <=32 because there are only 32 permutations of 5 "H" and "T"
-        assert len(counts_local) <= 32, "perm_counts failed to consolidate unique permutations"
 
-    def test_compare_combos_perms(self):
-        '''Ensure combo_counts returns <= the amount of rows as perm_counts'''
+    ##########################
+    ## Tests for play_codes ##
+    ##########################
 
-        g = game1()                 # 3 dice
-        g.play(50)                  # 50 rolls
+    def test_play_codes(self):
+        '''Ensure play_codes returns an integer code matrix of the right shape'''
 
-        a = Analyzer(g)
+        # Instantiate a Game object
+        g = game1()                     # 3 dice
 
-        # There should never be more combinations than permutations
-        assert len(a.combo_counts()) <= len(a.perm_counts()), "more combos than perms"
+        # get play results as codes
+        codes = g.play_codes(20)
+
+        # Ensure the code matrix has appropriate shape and values
+        assert isinstance(codes, np.ndarray), "play_codes failed to return a numpy array"
+        assert codes.shape == (20, 3), "play_codes returned an array of the wrong shape"
+        assert codes.dtype == np.uint8, "play_codes returned codes of an oversized dtype"
+        assert codes.max() < 6, "play_codes returned codes for nonexistant faces"
+
+
+    def test_play_codes_last_play(self):
+        '''Ensure the labeled last play matches the codes from play_codes'''
+
+        # Instantiate a Game object
+        g = game2()                     # 5 coins
+
+        codes = g.play_codes(10)
+
+        # Labels should be the faces at the positions given by the codes
+        assert (g.get_last_play().to_numpy() == g.get_faces()[codes]).all(), "get_last_play does not match play_codes"
+
+
+    def test_play_seed(self):
+        '''Ensure play replays the same game for the same seed'''
+
+        # Games seeded alike should agree
+        g1 = Game([die(), die(), die()], seed = 42)
+        g2 = Game([die(), die(), die()], seed = 42)
+        assert g1.play(30).equals(g2.play(30)), "seeded games disagree"
+
+        # An explicit seed should override the game's own generator
+        assert (g1.play_codes(30, seed = 1) == g2.play_codes(30, seed = np.random.default_rng(1))).all(), \
+            "play_codes with the same seed disagrees"
+
+
+    def test_play_parallel(self):
+        '''Ensure a seeded parallel play gives the same results for any number of workers'''
+
+        g = game1()                     # 3 dice
+
+        # 1000 rolls in chunks of 300 -> 4 chunks
+        two = g.play_codes(1000, seed = 5, workers = 2, chunk_size = 300)
+        three = g.play_codes(1000, seed = 5, workers = 3, chunk_size = 300)
+
+        assert two.shape == (1000, 3), "parallel play_codes returned an array of the wrong shape"
+        assert (two == three).all(), "parallel play_codes depends on the number of workers"
+
+        # The labeled results should come from the parallel play too
+        assert g.play(1000, seed = 5, workers = 2, chunk_size = 300).shape == (1000, 3), "parallel play returned the wrong shape"
+
+
+    def test_play_workers_value_error(self):
+        '''Ensure play raises ValueError when passed workers < 1'''
+
+        # Instantiate Game object
+        g = game1()                         # 3 dice
+
+        # Try to play game with bad input
+        try:
+            g.play(10, workers = 0)
+            # If the above works, this test should fail
+            assert 1 == 0, "play worked with zero workers"
+
+        # When the above fails, it should raise a ValueErrer
+        except Exception as v:
+            assert isinstance(v, ValueError), "play failed to raise ValueError when passed zero workers"
+
+
+    def test_play_codes_weights(self):
+        '''Ensure play_codes never rolls a face with zero weight'''
+
+        # Make a coin that can only land on "T"
+        c = coin()
+        c.change_weight("H", 0)
+
+        codes = Game([c, c]).play_codes(100)
+
+        assert (codes == 1).all(), "play_codes rolled a face with zero weight"
+
+
+
+    #########################
+    ## Tests for iter_play ##
+    #########################
+
+    def test_iter_play(self):
+        '''Ensure iter_play yields batches that add up to the requested rolls'''
+
+        g = game1()                     # 3 dice
+
+        # 25 rolls in batches of 10 -> 10, 10, 5
+        shapes = [batch.shape for batch in g.iter_play(25, batch_size = 10)]
+
+        assert shapes == [(10, 3), (10, 3), (5, 3)], "iter_play yielded batches of the wrong shapes"
+
+        # Streaming should not replace the last play
+        assert g.get_last_play() is None, "iter_play stored its batches as the last play"
+
+
+    def test_iter_play_value_error(self):
+        '''Ensure iter_play raises ValueError right away when passed batch_size < 1'''
+
+        # Try to stream a game with bad input; the error should come before any batch is requested
+        try:
+            game1().iter_play(10, batch_size = 0)
+            # If the above works, this test should fail
+            assert 1 == 0, "iter_play worked with zero batch_size"
+
+        # When the above fails, it should raise a ValueErrer
+        except Exception as v:
+            assert isinstance(v, ValueError), "iter_play failed to raise ValueError when passed zero batch_size"
+
+
+    ##########################
+    ## Tests for play_async ##
+    ##########################
+
+
+    def test_play_async(self):
+        '''Ensure play_async gives the same rolls as a parallel play() with the same seed, and reports progress'''
+
+        g = game1()
+        done = []
+
+        results = asyncio.run(g.play_async(1000, seed = 5, batch_size = 300, progress = lambda n, total : done.append(n)))
+
+        assert results.equals(game1().play(1000, seed = 5, workers = 2, chunk_size = 300)), "play_async rolled differently"
+        assert g.get_last_play().equals(results), "play_async did not store the last play"
+        assert done == [300, 600, 900, 1000], "play_async reported the wrong progress"
+
+
+    def test_play_async_cancel(self):
+        '''Ensure cancelling play_async stops it between batches without storing a play'''
+
+        g = game1()
+
+        async def cancel():
+            # Cancel from the first progress report
+            task = asyncio.current_task()
+            await g.play_async(10**6, batch_size = 1000, progress = lambda n, total : task.cancel())
+
+        try:
+            asyncio.run(cancel())
+            # If the above works, this test should fail
+            assert 1 == 0, "play_async was not cancelled"
+
+        # When the above fails, it should raise CancelledError and leave the Game unplayed
+        except BaseException as c:
+            assert isinstance(c, asyncio.CancelledError), "play_async raised other than CancelledError when cancelled"
+            assert g.get_generation() == 0, "cancelled play_async stored a play"
+
+
+
+
+######################################################################################################################
+###### DiceSet Tests #################################################################################################
+######################################################################################################################
+
+class DiceSetTest(unittest.TestCase):
+
+    ########################
+    ## Tests for __init__ ##
+    ########################
+
+
+    def test_init_type_error(self):
+        '''Ensure a DiceSet raises TypeError when its faces are not a numpy array'''
+
+        # Try to instantiate a DiceSet with a list of faces
+        try:
+            DiceSet(["H", "T"], [[1, 1]])
+            # If the above works, this test should fail
+            assert 1 == 0, "DiceSet instantiated with a list of faces"
+
+        # When the above fails, it should raise a TypeError
+        except Exception as t:
+            assert isinstance(t, TypeError), "DiceSet raised other than TypeError when passed a list of faces"
+
+
+    def test_init_value_error(self):
+        '''Ensure a DiceSet raises ValueError when the weights don't have one column per face'''
+
+        # Try to instantiate a DiceSet with three weights for two faces
+        try:
+            DiceSet(np.array(["H", "T"]), [[1, 1, 1]])
+            # If the above works, this test should fail
+            assert 1 == 0, "DiceSet instantiated with the wrong number of weights"
+
+        # When the above fails, it should raise a ValueError
+        except Exception as v:
+            assert isinstance(v, ValueError), "DiceSet raised other than ValueError when passed the wrong number of weights"
+
+
+    #########################
+    ## Tests for from_dice ##
+    #########################
+
+
+    def test_from_dice(self):
+        '''Ensure from_dice keeps the shared faces and one row of weights per Die'''
+
+        dice = [die(), die()]
+        dice[1].change_weight(6, 5)
+        dice_set = DiceSet.from_dice(dice)
+
+        assert len(dice_set) == 2, "DiceSet has the wrong number of dice"
+        assert (dice_set.get_faces() == np.arange(1, 7)).all(), "DiceSet has the wrong faces"
+        assert (dice_set.get_weights() == [[1] * 6, [1] * 5 + [5]]).all(), "DiceSet has the wrong weights"
+        assert [d.get_state().equals(o.get_state()) for d, o in zip(dice_set.to_dice(), dice)] == [True, True], \
+               "to_dice does not give back the dice"
+
+
+    ######################
+    ## Tests for sample ##
+    ######################
+
+
+    def test_sample_weighted(self):
+        '''Ensure each die in a DiceSet rolls with its own weights, for few and many faces'''
+
+        for n_faces in [2, 6]:
+            weights = np.array([np.ones(n_faces), np.arange(1, n_faces + 1)], dtype = float)
+            dice_set = DiceSet(np.arange(n_faces), weights)
+
+            codes = np.empty((200000, 2), dtype = np.uint8)
+            dice_set.sample(np.random.default_rng(0), codes)
+
+            for j in range(2):
+                freq = np.bincount(codes[:, j], minlength = n_faces) / len(codes)
+                assert np.allclose(freq, weights[j] / weights[j].sum(), atol = 0.01), "DiceSet rolled the wrong frequencies"
+
+
+    def test_sample_value_error(self):
+        '''Ensure sample raises ValueError when a row of weights is negative, not finite or all zero'''
+
+        for n_faces in [2, 6]:
+            for bad in [-1, np.nan, 0]:
+                weights = np.ones((2, n_faces))
+                if bad == 0: weights[1] = 0
+                else: weights[1, 0] = bad
+
+                # Try to sample with bad weights
+                try:
+                    DiceSet(np.arange(n_faces), weights).sample(np.random.default_rng(0), np.empty((10, 2), dtype = np.uint8))
+                    # If the above works, this test should fail
+                    assert 1 == 0, f"sample ran with weight {bad} on {n_faces} faces"
+
+                # When the above fails, it should raise a ValueError
+                except Exception as v:
+                    assert isinstance(v, ValueError), f"sample raised the wrong error with weight {bad} on {n_faces} faces"
+
+
+    def test_game_with_dice_set(self):
+        '''Ensure a Game can be given a DiceSet directly'''
+
+        g = Game(DiceSet(np.array(["H", "T"]), [[1, 0], [0, 1], [1, 0]]))
+        results = g.play(10)
+
+        assert results.shape == (10, 3), "Game with a DiceSet played the wrong shape"
+        assert (results.iloc[:, 0] == "H").all() and (results.iloc[:, 1] == "T").all(), "Game with a DiceSet ignored the weights"
+        assert len(g.get_dice()) == 3 and all(isinstance(d, Die) for d in g.get_dice()), "get_dice did not give Die objects"
+
+
+    def test_game_rebuilds_dice_set(self):
+        '''Ensure a Game's DiceSet follows later weight changes to its dice'''
+
+        g = game2()
+        g.get_dice()[0].change_weight("H", 0)
+
+        assert g.get_dice_set().get_weights()[0].tolist() == [0, 1], "DiceSet was not rebuilt after change_weight"
+        assert (g.play(100).iloc[:, 0] == "T").all(), "Game rolled a face with weight 0"
+
+
+
+######################################################################################################################
+###### Analyzer Tests ################################################################################################
+######################################################################################################################
+
+class AnalyzerTest(unittest.TestCase):
+
+    ########################
+    ## Tests for __init__ ##
+    ########################
+
+    def test_init_value_error1(self):
+        '''Ensure __init__ raises ValueError when passed other than a Game object'''
+
+        # Try to initialize with bad input
+        try:
+            a = Analyzer("puppies")
+            # If the above works, this test should fail
+            assert 1 == 0, "__init__ ran with string input"
+
+        # When the above fails, it should raise ValueError
+        except Exception as v:
+            assert isinstance(v, ValueError), "__init__ raised other than ValueError when passed string input"
+
+
+    def test_init_value_error2(self):
+        '''Ensure __init__ raises ValueError when passed other than a Game object'''
+
+        # Try to initialize with bad input
+        try:
+            a = Analyzer(100)
+            # If the above works, this test should fail
+            assert 1 == 0, "__init__ ran with integer input"
+
+        # When the above fails, it should raise ValueError
+        except Exception as v:
+            assert isinstance(v, ValueError), "__init__ raised other than ValueError when passed integer input"
+
+
+    def test_init(self):
+        '''Ensure __init__ instantiates an Analyzer object with the correct Game object'''
+
+        # Initialize Analyzer object
+        a = Analyzer(game1())                        # 3 dice
+        g = a.get_game()
+
+        # Ensure the Analyzer has a Game object attribute
+        assert isinstance(g, Game), "Analyzer initiated without Game object"
+
+        # Ensure the Game has a list of three Die objects
+        dice = g.get_dice()
+
+        assert len(dice) == 3, "Analyzer initiated with the wrong list of dice"
+
+        for d in dice:
+            assert isinstance(d, Die), "Analyser initiated with other than Die objects in Game"
+
+
+    #######################
+    ## Tests for jackpot ##
+    #######################
+
+    def test_jackpot0(self):
+        '''Ensure jackpot returns an integer equal to the number of jackpots'''
+
+        # We will have to construct a fake last play here
+        g = game1()                     # 3 dice
+        g._last_play = pd.DataFrame([[2, 3, 4, 1, 4],        # 0 jackpots
+                                     [3, 2, 4, 5, 3],
+                                     [3, 3, 3, 4, 5]
+                                     ])
+        
+        # Make sure jackpot == 2
+        assert Analyzer(g).jackpot() == 0, "jackpot failed to return zero when there were no jackpots"
+
+
+    def test_jackpot1(self):
+        '''Ensure jackpot returns an integer equal to the number of jackpots'''
+
+        # We will have to construct a fake last play here
+        g = game1()                     # 3 dice
+        g._last_play = pd.DataFrame([[1, 2, 3],
+                                     [4, 5, 6],
+                                     [3, 3, 3],
+                                     [6, 4, 2],
+                                     [4, 4, 4]])        # 2 jackpots
+        
+        # Make sure jackpot == 2
+        assert Analyzer(g).jackpot() == 2, "jackpot failed to return the correct number"
+
+
+    def test_jackpot_rolls(self):
+        '''Ensure jackpot returns the Roll # of each jackpot when asked'''
+
+        # We will have to construct a fake last play here
+        g = game1()                     # 3 dice
+        g._last_play = pd.DataFrame([[1, 2, 3],
+                                     [4, 5, 6],
+                                     [3, 3, 3],
+                                     [6, 4, 2],
+                                     [4, 4, 4]])        # jackpots on rolls 3 and 5
+
+        assert list(Analyzer(g).jackpot(return_rolls = True)) == [3, 5], "jackpot returned the wrong rolls"
+
+
+    def test_jackpot_rolls_stream(self):
+        '''Ensure jackpot numbers consumed rolls across batches'''
+
+        a = Analyzer(game1())           # 3 dice
+        a.consume([np.array([[0, 1, 2], [4, 4, 4]])], keep_jackpot_rolls = True)
+        a.consume([np.array([[1, 1, 1], [2, 3, 2]])], keep_jackpot_rolls = True)
+
+        assert a.jackpot() == 2, "jackpot miscounted consumed jackpots"
+        assert list(a.jackpot(return_rolls = True)) == [2, 3], "jackpot numbered consumed rolls incorrectly"
+        assert list(a.jackpot(return_rolls = True)) == [2, 3], "jackpot changed the kept rolls"
+
+
+    def test_jackpot_rolls_stream_value_error(self):
+        '''Ensure jackpot only counts consumed jackpots unless every batch kept its jackpot rolls'''
+
+        a = Analyzer(game1())           # 3 dice
+        a.consume([np.array([[0, 1, 2], [4, 4, 4]])])
+        a.consume([np.array([[1, 1, 1], [2, 3, 2]])], keep_jackpot_rolls = True)
+
+        assert a.jackpot() == 2, "jackpot miscounted consumed jackpots"
+        assert a._stream_jackpot_rolls is None, "consume kept jackpot rolls it wasn't asked to"
+
+        # Try to get the rolls of jackpots that weren't kept
+        try:
+            a.jackpot(return_rolls = True)
+            # If the above works, this test should fail
+            assert 1 == 0, "jackpot returned rolls that were not kept"
+
+        # When the above fails, it should raise a ValueError
+        except Exception as v:
+            assert isinstance(v, ValueError), "jackpot raised the wrong error for rolls that were not kept"
+
+
+    ###########################
+    ## Tests for face_counts ##
+    ###########################
+
+    def test_face_counts    (self):
+        '''Ensure that face_counts returns a data frame with proper shape and values'''
+
+        # Initialize Analyzer object to work with
+        g = game1()                     # 3 dice
+        g.play(10)                      # 10 rolls
+        a = Analyzer(g)
+
+        # face_counts should return a data frame of shape (10, 6): 10 rolls, 6 faces
+        assert a.face_counts().shape == (10, 6), "face_counts returned a data frame of the wrong shape"
+        
+        # Each row should add up to 3 (3 dice rolled therefore 3 faces to count)
+        for sum in a.face_counts().sum(axis = 1):
+            assert sum == 3, "face_counts returned inappropriate values"
+
+
+    def test_face_counts_values(self):
+        '''Ensure face_counts counts each face of each roll correctly'''
+
+        # Construct a fake last play
+        g = game1()                     # 3 dice
+        g._last_play = pd.DataFrame([[1, 1, 6],
+                                     [2, 3, 2]])
+
+        counts = Analyzer(g).face_counts()
+
+        assert counts.loc[1, 1] == 2 and counts.loc[1, 6] == 1, "face_counts miscounted the first roll"
+        assert counts.loc[2, 2] == 2 and counts.loc[2, 3] == 1, "face_counts miscounted the second roll"
+
+        # Faces that were never rolled still get a column of zeros
+        assert counts[5].sum() == 0, "face_counts miscounted a face that was never rolled"
+
+
+    def test_face_counts_many_dice(self):
+        '''Ensure face_counts does not overflow with more than 127 dice'''
+
+        # 200 coins that always land on "H"
+        c = coin()
+        c.change_weight("T", 0)
+        g = Game([c] * 200)
+        g.play(3)
+
+        assert (Analyzer(g).face_counts()["H"] == 200).all(), "face_counts overflowed with 200 dice"
+
+
+    def test_face_counts_async(self):
+        '''Ensure face_counts_async matches face_counts'''
+
+        g = game1()
+        g.play(1000)
+
+        counts = asyncio.run(Analyzer(g).face_counts_async(batch_size = 300))
+
+        assert counts.equals(Analyzer(g).face_counts()), "face_counts_async differs from face_counts"
+
+
+    ############################
+    ## Tests for combo_counts ##
+    ############################
+
+    def tests_combo_counts(self):
+        '''Ensure combo_counts returns a data frame with appropriate results'''
+        g = game1()                 # 3 dice
+        g.play(100)                 # 100 rolls
+
+        a = Analyzer(g)
+
+        assert isinstance(a.combo_counts(), pd.DataFrame), "combo_counts failed to return a pandas data frame"
+
+        counts_local = a.combo_counts()["Counts"]
+
+        # Counts should add up to 100
+        assert sum(counts_local) == 100, "combo_counts failed to report the correct number of results"
+
+        # Length should be <=32 because there are only 56 combinations of 3 numbers 1-6
+        assert len(counts_local) <= 56, "combo_counts failed to consolidate unique permutations"
+      
+
+
+
+    def test_combo_counts_values(self):
+        '''Ensure combo_counts groups rolls with the same faces in any order'''
+
+        # Construct a fake last play
+        g = game1()                     # 3 dice
+        g._last_play = pd.DataFrame([[1, 2, 3],
+                                     [3, 1, 2],
+                                     [6, 6, 1],
+                                     [1, 6, 6]])
+
+        combos = Analyzer(g).combo_counts()["Counts"]
+
+        assert combos[(1, 2, 3)] == 2 and combos[(1, 6, 6)] == 2, "combo_counts miscounted the combinations"
+        assert len(combos) == 2, "combo_counts failed to consolidate combinations"
+
+
+    def test_perm_counts_wide_keys(self):
+        '''Ensure perm_counts and combo_counts work when rolls don't fit in a 64 bit key'''
+
+        # 300 faces ** 8 dice is more than 2 ** 64
+        d = Die(np.arange(300))
+        g = Game([d] * 8)
+        g._last_play = pd.DataFrame([[299, 0, 1, 2, 3, 4, 5, 6],
+                                     [299, 0, 1, 2, 3, 4, 5, 6],
+                                     [0, 299, 1, 2, 3, 4, 5, 6]])
+        a = Analyzer(g)
+
+        assert list(a.perm_counts()["Counts"]) == [2, 1], "perm_counts miscounted wide rolls"
+        assert list(a.combo_counts()["Counts"]) == [3], "combo_counts miscounted wide rolls"
+        assert a.combo_counts().index[0] == (0, 1, 2, 3, 4, 5, 6, 299), "combo_counts mislabeled wide rolls"
+
+
+    #######################
+    ## Tests for consume ##
+    #######################
+
+    def test_consume(self):
+        '''Ensure consuming a stream in batches gives the same results as analyzing it all at once'''
+
+        g = game1()                     # 3 dice
+        codes = g.play_codes(200)
+        a_whole = Analyzer(g)
+
+        # Feed the same rolls in uneven batches
+        a_stream = Analyzer(g)
+        assert a_stream.consume([codes[:70], codes[70:71], codes[71:]]) == 200, "consume miscounted the rolls"
+
+        assert a_stream.jackpot() == a_whole.jackpot(), "consume miscounted the jackpots"
+        assert a_stream.face_totals().equals(a_whole.face_totals()), "consume miscounted the faces"
+
+        # Combos and perms should match regardless of row order
+        for stream, whole in [(a_stream.combo_counts(), a_whole.combo_counts()), (a_stream.perm_counts(), a_whole.perm_counts())]:
+            assert stream["Counts"].to_dict() == whole["Counts"].to_dict(), "consume miscounted combos or perms"
+
+
+    def test_consume_iter_play(self):
+        '''Ensure consume accepts iter_play batches directly'''
+
+        g = game2()                     # 5 coins
+        a = Analyzer(g)
+
+        assert a.consume(g.iter_play(1000, batch_size = 128)) == 1000, "consume miscounted the rolls"
+        assert a.face_totals()["Counts"].sum() == 5000, "face_totals miscounted the faces"
+        assert a.perm_counts()["Counts"].sum() == 1000, "perm_counts miscounted the consumed rolls"
+
+
+    def test_consume_value_error(self):
+        '''Ensure consume raises ValueError when a batch has the wrong number of dice'''
+
+        # Try to consume rolls of 2 dice into a 3 dice analyzer
+        try:
+            Analyzer(game1()).consume([np.zeros((4, 2), dtype = np.uint8)])
+            # If the above works, this test should fail
+            assert 1 == 0, "consume worked with batches of the wrong width"
+
+        # When the above fails, it should raise a ValueErrer
+        except Exception as v:
+            assert isinstance(v, ValueError), "consume failed to raise ValueError when passed batches of the wrong width"
+
+
+
+    def test_from_file(self):
+        '''Ensure an Analyzer reading a play file chunk by chunk matches one analyzing the rolls in memory'''
+
+        g = game1()                     # 3 dice
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = g.play_to_file(os.path.join(tmp, "game.mcp"), 500, seed = 2)
+            a = Analyzer.from_file(path, batch_size = 64)
+
+            b = Analyzer(Game.from_file(path))
+
+            assert a.jackpot() == b.jackpot(), "from_file miscounted the jackpots"
+            assert a.face_totals().equals(b.face_totals()), "from_file miscounted the faces"
+            assert a.perm_counts()["Counts"].sum() == 500, "from_file missed rolls"
+            del a, b
+
+
+    def test_save_results(self):
+        '''Ensure save_results and load_results round trip the Analyzer outputs'''
+
+        g = game1()                     # 3 dice
+        g.play(60)
+        a = Analyzer(g)
+
+        for format in ["npz", "parquet"] if has_pyarrow else ["npz"]:
+            with tempfile.TemporaryDirectory() as tmp:
+                a.save_results(tmp, format = format)
+                results = Analyzer.load_results(tmp)
+
+                assert results["face_counts"].equals(a.face_counts()), "load_results changed face_counts"
+                assert results["combo_counts"].equals(a.combo_counts()), "load_results changed combo_counts"
+                assert results["perm_counts"].equals(a.perm_counts()), "load_results changed perm_counts"
+
+
+    ###########################
+    ## Tests for incremental ##
+    ###########################
+
+    def test_cache_refresh(self):
+        '''Ensure results are recomputed after the Game is played again'''
+
+        g = game1()                     # 3 dice
+        g.play(10)
+        a = Analyzer(g)
+
+        a.face_counts()
+        generation = a.get_generation()
+
+        # Playing again should drop the cached results and move the generation on
+        g.play(20)
+        assert len(a.face_counts()) == 20, "face_counts returned results for a stale play"
+        assert a.perm_counts()["Counts"].sum() == 20, "perm_counts returned results for a stale play"
+        assert a.get_generation() > generation, "get_generation did not change after a new play"
+
+
+    def test_incremental(self):
+        '''Ensure an incremental Analyzer merges every later play and every batch it consumes'''
+
+        g = game2()                     # 5 coins
+        a = Analyzer(g, incremental = True)
+
+        assert a.jackpot() == 0 and a.get_generation() == 0, "incremental Analyzer did not start empty"
+
+        # Two plays and a stream of 3 batches, consumed as documented
+        codes = [g.play_codes(30), g.play_codes(40)]
+        batches = list(g.iter_play(50, batch_size = 20))
+        codes += batches
+
+        assert a.perm_counts()["Counts"].sum() == 70, "incremental Analyzer counted batches it was not given"
+        assert a.consume(batches) == 120, "incremental Analyzer counted consumed batches twice"
+
+        assert a.perm_counts()["Counts"].sum() == 120, "incremental Analyzer missed rolls"
+        assert a.get_generation() == 5, "incremental Analyzer miscounted its generations"
+
+        # The running totals should match consuming the same rolls in one batch
+        b = Analyzer(g)
+        b.consume([np.concatenate(codes)])
+        assert a.jackpot() == b.jackpot(), "incremental Analyzer miscounted the jackpots"
+        assert a.face_totals().equals(b.face_totals()), "incremental Analyzer miscounted the faces"
+
+
+    def test_incremental_consume_iter_play(self):
+        '''Ensure an incremental Analyzer consuming the Game's own stream counts every roll once'''
+
+        g = game1()
+        a = Analyzer(g, incremental = True)
+
+        assert a.consume(g.iter_play(1000, batch_size = 100)) == 1000, "consume counted streamed batches twice"
+        assert a.face_totals()["Counts"].sum() == 3000, "face_totals counted streamed batches twice"
+
+
+    def test_unsubscribe(self):
+        '''Ensure the Game forgets subscribers that were removed or garbage collected'''
+
+        g = game1()
+        seen = []
+        g.subscribe(seen.append)
+        Analyzer(g, incremental = True)           # dropped right away
+
+        g.play(5)
+        g.unsubscribe(seen.append)
+        g.play(5)
+
+        assert len(seen) == 1, "unsubscribe did not stop the callback"
+        assert g._subscribers == [], "the Game kept a garbage collected Analyzer"
+
+
+
+    ###########################
+    ## Tests for perm_counts ##
+    ###########################
+
+    def text_perm_counts(self):
+        '''Ensure perm_counts returns a data frame with appropriate results'''
+        g = game2()                 # 5 coins
+        g.play(40)                  # 40 rolls
+
+        a = Analyzer(g)
+
+        assert isinstance(a.perm_counts(), pd.DataFrame), "perm_counts failed to return a pandas data frame"
+
+        counts_local = a.perm_counts()["Counts"]
+
+        # Counts should add up to 40
+        assert sum(counts_local) == 40, "perm_counts failed to report the correct number of results"
+
+        # Length should be <=32 because there are only 32 permutations of 5 "H" and "T"
+        assert len(counts_local) <= 32, "perm_counts failed to consolidate unique permutations"
+
+    def test_compare_combos_perms(self):
+        '''Ensure combo_counts returns <= the amount of rows as perm_counts'''
+
+        g = game1()                 # 3 dice
+        g.play(50)                  # 50 rolls
+
+        a = Analyzer(g)
+
+        # There should never be more combinations than permutations
+        assert len(a.combo_counts()) <= len(a.perm_counts()), "more combos than perms"
+
+
+    ########################
+    ## Tests for estimate ##
+    ########################
+
+    def test_estimate_jackpot(self):
+        '''Ensure estimate plays until the jackpot rate is known to the relative error asked for'''
+
+        g = game1()
+        result = Analyzer(g).estimate(rel_error = 0.05, seed = 1)
+
+        assert result["converged"] and result["relative_error"] <= 0.05, "estimate stopped before reaching the target"
+        assert result["ci_low"] - 0.01 < 1 / 36 < result["ci_high"] + 0.01, "estimate is far from the jackpot probability"
+        assert g.get_last_codes() is None, "estimate stored its rolls as the last play"
+
+
+    def test_estimate_incremental(self):
+        '''Ensure the rolls played by estimate are not counted by incremental Analyzers, including the one estimating'''
+
+        g = game1()
+        a = Analyzer(g, incremental = True)
+        other = Analyzer(g, incremental = True)
+
+        a.estimate(rel_error = 0.2, seed = 2)
+
+        for analyzer in [a, other]:
+            assert analyzer.face_totals()["Counts"].sum() == 0, "estimate rolls were counted by an incremental Analyzer"
+            assert analyzer.jackpot() == 0, "estimate jackpots were counted by an incremental Analyzer"
+
+
+    def test_estimate_face(self):
+        '''Ensure estimate finds the share of dice showing a face'''
+
+        d = coin()
+        d.change_weight("H", 3)
+        result = Analyzer(Game([d, coin()])).estimate("face", face = "H", rel_error = 0.02, seed = 2)
+
+        assert abs(result["estimate"] - (0.75 + 0.5) / 2) < 0.02, "estimate is far from the face share"
+
+
+    def test_estimate_max_rolls(self):
+        '''Ensure estimate gives up after max_rolls when the target can't be reached'''
+
+        result = Analyzer(game1()).estimate(rel_error = 1e-6, batch_size = 100, max_rolls = 1000, seed = 3)
+
+        assert result["rolls"] == 1000 and not result["converged"], "estimate did not stop at max_rolls"
+
+        # The first batch is capped too
+        result = Analyzer(game1()).estimate(rel_error = 1e-6, max_rolls = 1000, seed = 3)
+        assert result["rolls"] == 1000, "estimate played more than max_rolls in its first batch"
+
+
+    def test_estimate_value_error(self):
+        '''Ensure estimate raises ValueError for an unknown statistic'''
+
+        # Try to estimate a statistic that doesn't exist
+        try:
+            Analyzer(game1()).estimate("median")
+            # If the above works, this test should fail
+            assert 1 == 0, "estimate ran with an unknown statistic"
+
+        # When the above fails, it should raise ValueError
+        except Exception as v:
+            assert isinstance(v, ValueError), "estimate raised the wrong error when passed an unknown statistic"
+
+
+    def test_estimate_max_rolls_value_error(self):
+        '''Ensure estimate raises ValueError when max_rolls is not positive'''
+
+        # Try to estimate without any rolls
+        try:
+            Analyzer(game1()).estimate(max_rolls = 0)
+            # If the above works, this test should fail
+            assert 1 == 0, "estimate ran with max_rolls 0"
+
+        # When the above fails, it should raise ValueError
+        except Exception as v:
+            assert isinstance(v, ValueError), "estimate raised the wrong error when passed max_rolls 0"
+
+
+    ############################
+    ## Tests for rare_jackpot ##
+    ############################
+
+    def test_rare_jackpot(self):
+        '''Ensure rare_jackpot estimates a jackpot probability too small for jackpot() to see, within its standard error'''
+
+        faces = np.arange(26)
+        g = Game(DiceSet(faces, np.random.default_rng(0).random((8, 26)) + 0.1))
+        exact = ExactAnalyzer(g).jackpot()
+
+        for method in ["stratified", "mixture"]:
+            result = Analyzer(g).rare_jackpot(10**5, method = method, seed = 1)
+            assert abs(result["estimate"] - exact) < 4 * result["std_error"], f"{method} rare_jackpot is off"
+            assert result["std_error"] < exact / 10, f"{method} rare_jackpot is not precise"
+
+
+    def test_rare_jackpot_value_error(self):
+        '''Ensure rare_jackpot raises ValueError for a tilt outside [0, 1]'''
+
+        # Try to tilt the dice too far
+        try:
+            Analyzer(game1()).rare_jackpot(100, tilt = 2)
+            # If the above works, this test should fail
+            assert 1 == 0, "rare_jackpot ran with tilt 2"
+
+        # When the above fails, it should raise ValueError
+        except Exception as v:
+            assert isinstance(v, ValueError), "rare_jackpot raised the wrong error when passed tilt 2"
+
+
+    def test_rare_jackpot_value_error_rolls(self):
+        '''Ensure stratified rare_jackpot raises ValueError when a face would get fewer than 2 rolls'''
+
+        # Try to split 11 rolls over 6 faces; mixture needs no strata
+        assert Analyzer(game1()).rare_jackpot(11, method = "mixture", seed = 1)["rolls"] == 11, "mixture rejected 11 rolls"
+        try:
+            Analyzer(game1()).rare_jackpot(11, seed = 1)
+            # If the above works, this test should fail
+            assert 1 == 0, "stratified rare_jackpot ran with 11 rolls over 6 faces"
+
+        # When the above fails, it should raise ValueError
+        except Exception as v:
+            assert isinstance(v, ValueError), "stratified rare_jackpot raised the wrong error when passed 11 rolls"
+
+        assert Analyzer(game1()).rare_jackpot(12, seed = 1)["rolls"] == 12, "stratified rare_jackpot rejected 12 rolls"
+
+
+    ###########################
+    ## Tests for word_counts ##
+    ###########################
+
+    def test_word_counts(self):
+        '''Ensure word_counts finds exactly the permutations that are words, with their counts'''
+
+        g = Game([Die(np.array(["A", "T", "C"]))] * 3)
+        g.play(500)
+
+        a = Analyzer(g)
+        words = a.word_counts(WordIndex(["CAT", "ACT", "TAT", "DOG", "AT"], g.get_faces()))
+
+        # Compare against joining every permutation into a string
+        expected = {"".join(perm) : n for perm, n in a.perm_counts()["Counts"].items() if "".join(perm) in ["CAT", "ACT", "TAT"]}
+        assert words["Counts"].to_dict() == expected, "word_counts failed to find the words rolled"
+
+
+
+
+
+######################################################################################################################
+###### WordIndex Tests ###############################################################################################
+######################################################################################################################
+
+class WordIndexTest(unittest.TestCase):
+
+    ########################
+    ## Tests for __init__ ##
+    ########################
+
+
+    def test_init_type_error(self):
+        '''Ensure a WordIndex raises TypeError when its faces are not a numpy array'''
+
+        # Try to instantiate a WordIndex with a list of faces
+        try:
+            WordIndex(["AT"], ["A", "T"])
+            # If the above works, this test should fail
+            assert 1 == 0, "WordIndex instantiated with a list of faces"
+
+        # When the above fails, it should raise a TypeError
+        except Exception as t:
+            assert isinstance(t, TypeError), "WordIndex raised other than TypeError when passed a list of faces"
+
+
+    def test_init_skips_unspellable(self):
+        '''Ensure a WordIndex only keeps the words spelled with its faces, bucketed by length'''
+
+        index = WordIndex(["AT", "TA", "CAT", "DOG", ""], np.array(["A", "C", "T"]))
+
+        assert len(index) == 3, "WordIndex kept the wrong number of words"
+        assert index.get_lengths() == [2, 3], "WordIndex has the wrong word lengths"
+
+
+    #####################
+    ## Tests for match ##
+    #####################
+
+
+    def test_match(self):
+        '''Ensure match finds the rows that spell words, including with reordered faces and long words'''
+
+        faces = np.array(list("ABCDEFGHIJKLMNOPQRSTUVWXYZ"))
+        words = ["CAT", "ABSOLUTENESSES"]
+        index = WordIndex(words, faces)
+
+        code = lambda word : [faces.tolist().index(c) for c in word]
+        assert index.match(np.array([code("CAT"), code("TAC")])).tolist() == [True, False], "match failed on short words"
+        assert index.match(np.array([code("ABSOLUTENESSES"), code("ABSOLUTENESSEZ")])).tolist() == [True, False], \
+               "match failed on words longer than one packed key"
+
+        # The same rolls coded against reversed faces
+        backwards = faces[::-1]
+        recode = lambda word : [backwards.tolist().index(c) for c in word]
+        assert index.match(np.array([recode("CAT"), recode("ACT")]), backwards).tolist() == [True, False], \
+               "match failed with the caller's faces"
+
+
+    #########################
+    ## Tests for from_file ##
+    #########################
+
+
+    def test_from_file_cache(self):
+        '''Ensure from_file writes a cache and later loads the same index from it'''
+
+        faces = np.array(["A", "C", "T"])
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path, cache = os.path.join(tmp, "words.txt"), os.path.join(tmp, "words.npz")
+            with open(path, "w") as f: f.write("AT\nCAT\nDOG\n")
+
+            index = WordIndex.from_file(path, faces, cache = cache)
+            assert os.path.exists(cache), "from_file did not write the cache"
+
+            cached = WordIndex.from_file(path, faces, cache = cache)
+            assert len(cached) == len(index) == 2, "cached WordIndex has the wrong number of words"
+            assert cached.match(np.array([[1, 0, 2]])).tolist() == [True], "cached WordIndex failed to match"
+
+
+
+######################################################################################################################
+###### ExactAnalyzer Tests ###########################################################################################
+######################################################################################################################
+
+class ExactAnalyzerTest(unittest.TestCase):
+
+    def test_init_value_error(self):
+        '''Ensure __init__ raises ValueError when passed other than a Game object'''
+
+        # Try to initialize with bad input
+        try:
+            ExactAnalyzer("puppies")
+            # If the above works, this test should fail
+            assert 1 == 0, "__init__ ran with string input"
+
+        # When the above fails, it should raise ValueError
+        except Exception as v:
+            assert isinstance(v, ValueError), "__init__ raised other than ValueError when passed string input"
+
+
+    def test_jackpot(self):
+        '''Ensure jackpot returns the exact jackpot probability'''
+
+        # 3 fair dice: 6 jackpots out of 6 ** 3 rolls
+        assert np.isclose(ExactAnalyzer(game1()).jackpot(), 1 / 36), "jackpot returned the wrong probability"
+
+        # An unfair coin (H twice as likely) and a fair one: 2/3 * 1/2 + 1/3 * 1/2
+        c = coin()
+        c.change_weight("H", 2)
+        assert np.isclose(ExactAnalyzer(Game([c, coin()])).jackpot(), 0.5), "jackpot mishandled unfair dice"
+
+
+    def test_face_counts(self):
+        '''Ensure face_counts returns the binomial distribution for fair coins'''
+
+        counts = ExactAnalyzer(game2()).face_counts()           # 5 coins
+
+        assert counts.shape == (6, 2), "face_counts returned a data frame of the wrong shape"
+        assert np.allclose(counts["H"], [1, 5, 10, 10, 5, 1] / np.float64(32)), "face_counts returned the wrong distribution"
+
+
+    def test_combo_counts(self):
+        '''Ensure combo_counts lists every combination with probabilities adding up to 1'''
+
+        # Unfair dice so the combinations are not symmetric
+        d = die()
+        d.change_weight(6, 5)
+        combos = ExactAnalyzer(Game([d, die(), die()])).combo_counts()["Probability"]
+
+        # 56 combinations of 3 numbers 1-6
+        assert len(combos) == 56, "combo_counts listed the wrong number of combinations"
+        assert np.isclose(combos.sum(), 1), "combo_counts probabilities do not add up to 1"
+
+        # Three sixes: 5/10 * 1/6 * 1/6
+        assert np.isclose(combos[(6, 6, 6)], 5 / 360), "combo_counts returned the wrong probability"
+
+
+    def test_perm_counts(self):
+        '''Ensure perm_counts lists every permutation with probabilities adding up to 1'''
+
+        perms = ExactAnalyzer(game2()).perm_counts()["Probability"]         # 5 coins
+
+        assert len(perms) == 32, "perm_counts listed the wrong number of permutations"
+        assert np.allclose(perms, 1 / 32), "perm_counts returned the wrong probabilities"
+
+
+    def test_perm_counts_value_error(self):
+        '''Ensure perm_counts raises ValueError when there are more permutations than max_outcomes'''
+
+        # Try to list 6 ** 3 permutations with a limit of 100
+        try:
+            ExactAnalyzer(game1(), max_outcomes = 100).perm_counts()
+            # If the above works, this test should fail
+            assert 1 == 0, "perm_counts listed more permutations than max_outcomes"
+
+        # When the above fails, it should raise ValueError
+        except Exception as v:
+            assert isinstance(v, ValueError), "perm_counts raised other than ValueError with too many permutations"
+
+
+
+######################################################################################################################
+###### Sweep Tests ###################################################################################################
+######################################################################################################################
+
+class SweepTest(unittest.TestCase):
+
+    #####################
+    ## Tests for sweep ##
+    #####################
+
+
+    def test_sweep_table(self):
+        '''Ensure sweep returns one row per configuration with its results'''
+
+        faces = np.array(["H", "T"])
+        results = sweep(faces, [[1, 1], [3, 1]], [2, 3], 2000, seed = 1)
+
+        assert len(results) == 4, "sweep returned the wrong number of configurations"
+        assert results["Dice"].tolist() == [2, 3, 2, 3], "sweep returned the configurations out of order"
+        assert ((results["Mean H"] + results["Mean T"]) == results["Dice"]).all(), "sweep face means don't add up"
+        assert results["Top combo"].map(len).tolist() == [2, 3, 2, 3], "sweep top combos have the wrong number of faces"
+
+
+    def test_sweep_common_random_numbers(self):
+        '''Ensure every configuration is rolled from the same draws, with or without a process pool'''
+
+        faces = np.arange(1, 7)
+        weights = [[1] * 6, [1] * 5 + [5], [1] * 6]
+        results = sweep(faces, weights, [3], 5000, seed = 2)
+
+        # Equal weights give equal results, and tilting toward 6 can only turn rolls into 6s
+        assert results.drop(columns = "Weights").iloc[0].equals(results.drop(columns = "Weights").iloc[2]), \
+               "equal configurations differ"
+        assert results["Mean 6"][1] > results["Mean 6"][0], "tilted configuration rolled fewer 6s"
+        assert results.equals(sweep(faces, weights, [3], 5000, seed = 2, workers = 2)), "process pool changed the results"
+
+
+    def test_sweep_many_dice(self):
+        '''Ensure sweep plays configurations of any number of dice, each die drawing the same numbers in all of them'''
+
+        faces = np.array(["H", "T"])
+        results = sweep(faces, [[1, 1]], [2, 3, 100], 2000, seed = 3)
+
+        assert results["Dice"].tolist() == [2, 3, 100], "sweep returned the wrong configurations"
+        assert len(results["Top combo"][2]) == 100, "sweep top combo has the wrong number of faces"
+
+        # The first two dice of the 3 dice configuration roll like the 2 dice one, so it can't have more jackpots
+        assert results["Jackpot rate"][1] <= results["Jackpot rate"][0], "dice drew different numbers across configurations"
+        assert results.iloc[[0]].equals(sweep(faces, [[1, 1]], [2], 2000, seed = 3)), \
+               "other configurations changed the results"
+
+
+    def test_inverse_cdf(self):
+        '''Ensure the draws used by sweep roll each die with its own weights'''
 
+        weights = np.array([np.ones(26), np.arange(1, 27)], dtype = float)
+        codes = np.empty((200000, 2), dtype = np.uint8)
+        DiceSet(np.arange(26), weights)._inverse_cdf(np.random.default_rng(0).random(codes.shape), codes)
 
+        for j in range(2):
+            freq = np.bincount(codes[:, j], minlength = 26) / len(codes)
+            assert np.allclose(freq, weights[j] / weights[j].sum(), atol = 0.005), "inverse cdf rolled the wrong frequencies"
 
 
 if __name__ == "__main__":
@@ -10,4 +10,5 @@ setup(
 	long_description = "README.md",
 	packages = ["montecarlo"],
 	install_requires = ["numpy >= 1.11.1", "pandas >= 1.0"],
+	extras_require = {"parquet" : ["pyarrow"]},
 )